@@ -0,0 +1,203 @@
+"""
+全局带宽控制模块
+所有下载线程共用一个令牌桶，可按站点再设置子限额；下载线程在进度回调中按实际传输的字节数取令牌，
+超出限额时在回调中等待，从而降低该线程的下载速度
+
+config.json 示例（单位为 字节/秒，也可以写成 "10M"、"500K"；0 或 null 表示不限速）:
+    "bandwidth_limit": "20M",
+    "host_bandwidth_limits": {"bilibili.com": "8M"}
+
+限额可在运行中修改（Web界面或修改config.json），正在进行的下载立即按新限额执行
+"""
+
+import re
+import threading
+import time
+from typing import Callable, Dict, Optional, Union
+from urllib.parse import urlparse
+
+from settings import load_config
+
+
+# 令牌桶容量（允许的突发量）至少为该值，避免大块数据每次都要等待
+MIN_BURST = 256 * 1024
+# 等待令牌时每次最长睡眠的时间，期间限额被修改可以及时生效
+MAX_SLEEP = 0.5
+# 检查config.json是否修改的间隔（秒）
+CONFIG_CHECK_INTERVAL = 1.0
+
+_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_rate(value: Union[str, int, float, None]) -> Optional[int]:
+    """解析速度限额，如 "10M"、"500K"、"1.5MB"、1048576；空值或0返回None（不限速）"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) if value > 0 else None
+    text = value.strip().upper()
+    if not text:
+        return None
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([KMG]?)(?:I?B)?(?:/S)?', text)
+    if not match:
+        raise ValueError(f"无法识别的速度: {value}（示例: 10M、500K）")
+    rate = int(float(match.group(1)) * _UNITS[match.group(2)])
+    return rate or None
+
+
+def format_rate(rate: Optional[int]) -> str:
+    if not rate:
+        return "不限速"
+    for unit in ('G', 'M', 'K'):
+        if rate >= _UNITS[unit]:
+            return f"{rate / _UNITS[unit]:g}{unit}/s"
+    return f"{rate}B/s"
+
+
+class TokenBucket:
+    """线程安全的令牌桶（单位为字节）；rate为None表示不限速"""
+
+    def __init__(self, rate: Optional[int] = None):
+        self._condition = threading.Condition()
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self.rate = None
+        self.burst = MIN_BURST
+        self.set_rate(rate)
+
+    def set_rate(self, rate: Optional[int]):
+        """修改限额，正在等待的线程按新限额重新计算等待时间"""
+        with self._condition:
+            self._refill()
+            self.rate = rate or None
+            self.burst = max(MIN_BURST, self.rate or 0)
+            # 放弃修改前累积的欠额和令牌，新限额从当前开始计算
+            self._tokens = 0.0
+            self._condition.notify_all()
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def consume(self, amount: int):
+        """取出amount个令牌，不足时等待（令牌可以透支，等欠额补齐后返回）"""
+        with self._condition:
+            if not self.rate:
+                return
+            self._refill()
+            self._tokens -= amount
+            while self.rate and self._tokens < 0:
+                self._condition.wait(min(-self._tokens / self.rate, MAX_SLEEP))
+                self._refill()
+
+
+class BandwidthGovernor:
+    """进程内共享的带宽控制器：全局令牌桶 + 按站点的令牌桶"""
+
+    def __init__(self):
+        self.limit: Optional[int] = None
+        self.host_limits: Dict[str, int] = {}
+        self._global = TokenBucket()
+        self._hosts: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._config = None
+        self._config_checked = 0.0
+
+    def configure(self, limit: Optional[int] = None, host_limits: Optional[Dict[str, Optional[int]]] = None):
+        """
+        修改限额（立即对正在进行的下载生效）
+
+        Args:
+            limit: 全局限额（字节/秒），None表示不限速
+            host_limits: 按域名的限额，子域名共享同一限额；None表示保持当前的站点限额
+        """
+        with self._lock:
+            self.limit = limit or None
+            self._global.set_rate(self.limit)
+            if host_limits is not None:
+                self.host_limits = {
+                    domain.lower().lstrip('.'): rate for domain, rate in host_limits.items() if rate
+                }
+                for domain, bucket in self._hosts.items():
+                    bucket.set_rate(self.host_limits.get(domain))
+
+    def reload_config(self, force: bool = False):
+        """config.json修改后重新读取限额（Web界面设置的限额在此之前一直有效）"""
+        now = time.monotonic()
+        if not force and now - self._config_checked < CONFIG_CHECK_INTERVAL:
+            return
+        self._config_checked = now
+        config = load_config()
+        if config is self._config and not force:
+            return
+        self._config = config
+        self.configure(
+            parse_rate(config.get('bandwidth_limit')),
+            {domain: parse_rate(rate) for domain, rate in config.get('host_bandwidth_limits', {}).items()}
+        )
+
+    def _host_bucket(self, url: str) -> Optional[TokenBucket]:
+        host = (urlparse(url).hostname or '').lower()
+        with self._lock:
+            for domain, rate in self.host_limits.items():
+                if host == domain or host.endswith('.' + domain):
+                    bucket = self._hosts.get(domain)
+                    if bucket is None:
+                        bucket = self._hosts[domain] = TokenBucket(rate)
+                    return bucket
+        return None
+
+    def consume(self, url: str, amount: int):
+        """下载了amount字节后调用，超出站点或全局限额时阻塞等待"""
+        self.reload_config()
+        if amount <= 0:
+            return
+        bucket = self._host_bucket(url)
+        if bucket is not None:
+            bucket.consume(amount)
+        self._global.consume(amount)
+
+    def progress_hook(self, url: str) -> Callable[[Dict], None]:
+        """
+        创建用于单个视频的 yt-dlp 进度回调：按文件记录累计字节数，把增量交给令牌桶
+        回调在下载线程（分片并发时为各分片线程）中执行，等待令牌即降低该线程的速度
+        """
+        bytes_seen = {}
+        lock = threading.Lock()
+
+        def hook(status: Dict):
+            if status.get('status') != 'downloading':
+                return
+            filename = status.get('filename') or ''
+            downloaded = status.get('downloaded_bytes') or 0
+            with lock:
+                delta = downloaded - bytes_seen.get(filename, 0)
+                if delta > 0:
+                    bytes_seen[filename] = downloaded
+            if delta > 0:
+                self.consume(url, delta)
+
+        return hook
+
+    def describe(self) -> str:
+        """当前限额的文字说明"""
+        text = f"全局 {format_rate(self.limit)}"
+        if self.host_limits:
+            text += "，" + "，".join(f"{domain} {format_rate(rate)}" for domain, rate in self.host_limits.items())
+        return text
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_bandwidth_governor() -> BandwidthGovernor:
+    """获取进程内共享的带宽控制器（首次调用时读取config.json的限额）"""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = BandwidthGovernor()
+            _governor.reload_config(force=True)
+        return _governor
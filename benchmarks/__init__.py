@@ -0,0 +1,8 @@
+"""
+离线基准测试
+在本地启动媒体服务器（支持 Range 的 MP4 / HLS）、标题页面和合集接口，配合只匹配本地站点的
+yt-dlp 提取器，测量合集解析、标题获取、下载和音频提取各阶段的吞吐量与延迟分位数
+
+用法（在项目目录下运行）:
+    python -m benchmarks --videos 20 --iterations 3
+"""
@@ -0,0 +1,202 @@
+"""
+离线基准测试入口
+
+    python -m benchmarks [--videos N] [--iterations N] [--workers N] [--only 阶段 ...] [--json 输出文件]
+
+所有网络请求都指向本地测试服务器，缓存、下载存档和下载文件都写入临时目录，不影响项目数据
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import metadata_cache
+from bandwidth import get_bandwidth_governor, parse_rate
+from download_engine import get_engine
+from download_scheduler import get_download_scheduler
+from settings import override_config
+from sperate_audio import convert_to_audio
+from turbo import TRANSFER_MODES
+from video_dlp import check_playlist, download_videos, get_playlist_videos
+from video_title_fetcher import enhance_video_titles
+
+from benchmarks.extractors import EXTRACTORS
+from benchmarks.media import ffmpeg_available, prepare_media
+from benchmarks.server import BenchmarkServer
+from benchmarks.stats import StageResult, format_report
+
+
+STAGES = ('check_playlist', 'enhance_video_titles', 'download_videos', 'convert_to_audio')
+
+
+@contextlib.contextmanager
+def isolate_state(work_dir: str, workers: int, bandwidth_limit=None):
+    """
+    缓存、下载存档等使用临时目录，避免命中或污染项目的 .cache；
+    并发数和带宽限额使用测试参数，不受config.json中的配置影响
+    """
+    with override_config(cache_dir=work_dir, max_workers=workers,
+                         bandwidth_limit=bandwidth_limit, host_bandwidth_limits={}):
+        get_bandwidth_governor().reload_config(force=True)
+        get_download_scheduler().reload_config(force=True)
+        yield
+
+
+def bench_check_playlist(server: BenchmarkServer, videos: int, iterations: int) -> StageResult:
+    result = StageResult('check_playlist')
+    url = server.playlist_url(videos)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call_start = time.perf_counter()
+        _, entries = check_playlist(url, use_cache=False)
+        result.latencies.append(time.perf_counter() - call_start)
+        result.items += len(entries)
+    result.wall_seconds = time.perf_counter() - start
+    result.note = f"每次枚举 {videos} 个条目"
+    return result
+
+
+def bench_enhance_titles(server: BenchmarkServer, videos: int, iterations: int) -> StageResult:
+    result = StageResult('enhance_video_titles')
+    url = server.playlist_url(videos)
+    _, entries = check_playlist(url, use_cache=False)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        # 每轮清空缓存，测量真实的获取过程
+        metadata_cache.get_metadata_cache().clear()
+        batch = get_playlist_videos(entries)
+        call_start = time.perf_counter()
+        enhance_video_titles(batch, url)
+        result.latencies.append(time.perf_counter() - call_start)
+        result.items += len(batch)
+    result.wall_seconds = time.perf_counter() - start
+    result.note = "每次调用的延迟"
+    return result
+
+
+def bench_download(server: BenchmarkServer, videos: int, iterations: int, workers: int,
+                   work_dir: str, transfer_mode: str = 'normal') -> StageResult:
+    result = StageResult('download_videos')
+    url = server.playlist_url(videos)
+    _, entries = check_playlist(url, use_cache=False)
+    batch = get_playlist_videos(entries)
+    lock = threading.Lock()
+
+    for iteration in range(iterations):
+        started = {}
+
+        def on_progress(event):
+            with lock:
+                started.setdefault(event.key, time.perf_counter())
+
+        def on_result(item):
+            finished = time.perf_counter()
+            with lock:
+                result.latencies.append(finished - started.get(str(item['index']), iteration_start))
+                if item['success']:
+                    result.items += 1
+                    result.bytes += sum(os.path.getsize(path) for path in item['filepaths'] if os.path.exists(path))
+
+        iteration_start = time.perf_counter()
+        download_videos(
+            url, batch, list(range(len(batch))), use_timestamp=False, max_workers=workers,
+            on_result=on_result, base_path=os.path.join(work_dir, "downloads", str(iteration)),
+            on_progress=on_progress, skip_downloaded=False, transfer_mode=transfer_mode
+        )
+        result.wall_seconds += time.perf_counter() - iteration_start
+    result.note = f"{workers} 个并行下载（{transfer_mode}），延迟为单个视频从开始下载到完成"
+    return result
+
+
+def bench_convert(work_dir: str, iterations: int) -> StageResult:
+    result = StageResult('convert_to_audio')
+    if not ffmpeg_available():
+        result.note = "跳过：未安装 ffmpeg"
+        return result
+
+    # 使用下载阶段的输出（MP4）作为输入
+    sources = []
+    for root, _, files in os.walk(os.path.join(work_dir, "downloads")):
+        sources.extend(os.path.join(root, name) for name in files if name.endswith(".mp4"))
+    if not sources:
+        result.note = "跳过：没有可用的下载结果"
+        return result
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for source in sources:
+            call_start = time.perf_counter()
+            output = convert_to_audio(source, "3", "1")
+            result.latencies.append(time.perf_counter() - call_start)
+            if output:
+                result.items += 1
+                result.bytes += os.path.getsize(source)
+                os.remove(output)
+    result.wall_seconds = time.perf_counter() - start
+    result.note = "自动格式（可复制音频流时不重新编码），MB/秒按输入视频计算"
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="离线基准测试")
+    parser.add_argument("--videos", type=int, default=20, help="合集中的视频数（默认20）")
+    parser.add_argument("--iterations", type=int, default=3, help="每个阶段重复次数（默认3）")
+    parser.add_argument("--workers", type=int, default=3, help="并行下载数（默认3）")
+    parser.add_argument("--duration", type=float, default=10, help="测试视频时长，秒（默认10）")
+    parser.add_argument("--size-mb", type=float, default=8, help="没有 ffmpeg 时随机数据文件的大小，MB（默认8）")
+    parser.add_argument("--transfer-mode", choices=TRANSFER_MODES, default='normal',
+                        help="下载阶段的传输模式（默认normal）")
+    parser.add_argument("--bandwidth-limit", type=parse_rate, metavar="RATE",
+                        help="下载阶段的全局限速，如 10M（默认不限速，忽略config.json中的限额）")
+    parser.add_argument("--no-hls", action="store_true", help="不生成 HLS 媒体")
+    parser.add_argument("--only", nargs="+", choices=STAGES, help="只运行指定阶段")
+    parser.add_argument("--json", metavar="PATH", help="将结果写入JSON文件")
+    parser.add_argument("--verbose", action="store_true", help="显示被测模块的输出")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stages = args.only or STAGES
+    for extractor in EXTRACTORS:
+        get_engine().register_extractor(extractor)
+
+    with tempfile.TemporaryDirectory(prefix="streamcraft-bench-") as work_dir, \
+            isolate_state(work_dir, args.workers, args.bandwidth_limit):
+        print("🎞️ 正在生成测试媒体..." if ffmpeg_available() else "⚠️ 未安装 ffmpeg，使用随机数据文件（只测量传输）")
+        media = prepare_media(os.path.join(work_dir, "media"), args.duration, args.size_mb, not args.no_hls)
+
+        results = []
+        with BenchmarkServer(os.path.join(work_dir, "media"), media) as server:
+            print(f"🌐 本地测试服务器: {server.base_url}，媒体: {', '.join(media)}")
+            for stage in stages:
+                print(f"⏱️ 正在测量 {stage}...")
+                output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+                with output:
+                    if stage == 'check_playlist':
+                        results.append(bench_check_playlist(server, args.videos, args.iterations))
+                    elif stage == 'enhance_video_titles':
+                        results.append(bench_enhance_titles(server, args.videos, args.iterations))
+                    elif stage == 'download_videos':
+                        results.append(bench_download(server, args.videos, args.iterations, args.workers, work_dir,
+                                                      args.transfer_mode))
+                    elif stage == 'convert_to_audio':
+                        results.append(bench_convert(work_dir, args.iterations))
+
+    print()
+    print(format_report(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([result.to_dict() for result in results], f, ensure_ascii=False, indent=2)
+        print(f"\n📄 结果已写入 {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
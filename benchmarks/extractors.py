@@ -0,0 +1,60 @@
+"""
+基准测试用的 yt-dlp 提取器，只匹配本地测试服务器的URL
+"""
+
+from yt_dlp.extractor.common import InfoExtractor
+from yt_dlp.utils import OnDemandPagedList
+
+_LOCAL_HOST = r"https?://(?:127\.0\.0\.1|localhost):\d+"
+PLAYLIST_PAGE_SIZE = 50
+
+
+class BenchVideoIE(InfoExtractor):
+    IE_NAME = "bench:video"
+    _VALID_URL = _LOCAL_HOST + r"/watch/(?P<id>v\d+)"
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        webpage = self._download_webpage(url, video_id, note=False)
+        media_path = self._search_regex(r'data-media="([^"]+)"', webpage, "media")
+        media_url = self._search_regex(r"^(" + _LOCAL_HOST + r")", url, "base url") + media_path
+
+        if media_path.endswith(".m3u8"):
+            formats = self._extract_m3u8_formats(media_url, video_id, "mp4", m3u8_id="hls", note=False)
+        else:
+            formats = [{
+                "url": media_url,
+                "format_id": "mp4",
+                "ext": "mp4",
+                "vcodec": "h264",
+                "acodec": "aac",
+                "height": 720,
+            }]
+        return {
+            "id": video_id,
+            "title": self._html_extract_title(webpage),
+            "formats": formats,
+        }
+
+
+class BenchPlaylistIE(InfoExtractor):
+    IE_NAME = "bench:playlist"
+    _VALID_URL = r"(?P<base>" + _LOCAL_HOST + r")/playlist/(?P<id>\d+)"
+
+    def _real_extract(self, url):
+        base, count = self._match_valid_url(url).group("base", "id")
+
+        def fetch_page(page):
+            data = self._download_json(
+                f"{base}/api/playlist", count, note=False,
+                query={"count": count, "page": page, "size": PLAYLIST_PAGE_SIZE}
+            )
+            for video_id in data["ids"]:
+                yield self.url_result(f"{base}/watch/{video_id}", BenchVideoIE, video_id, f"Video {video_id}")
+
+        return self.playlist_result(
+            OnDemandPagedList(fetch_page, PLAYLIST_PAGE_SIZE), count, f"Benchmark playlist ({count})"
+        )
+
+
+EXTRACTORS = [BenchVideoIE, BenchPlaylistIE]
@@ -0,0 +1,75 @@
+"""
+基准测试媒体生成
+使用 ffmpeg 的 lavfi 虚拟输入生成测试视频（MP4 和 HLS）；没有 ffmpeg 时生成随机数据文件，只用于测量传输
+"""
+
+import os
+import shutil
+import subprocess
+from typing import List
+
+
+def ffmpeg_available() -> bool:
+    """是否同时安装了 ffmpeg 和 ffprobe"""
+    return shutil.which("ffmpeg") is not None and shutil.which("ffprobe") is not None
+
+
+def _run_ffmpeg(args: List[str]):
+    subprocess.run(["ffmpeg", "-nostdin", "-y", "-v", "error", *args], check=True)
+
+
+def generate_mp4(path: str, duration: float = 10, size: str = "1280x720", video_bitrate: str = "4M"):
+    """生成带测试图像和正弦波音轨的 H.264/AAC 视频"""
+    _run_ffmpeg([
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=30",
+        "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000",
+        "-t", str(duration),
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", "-b:v", video_bitrate,
+        "-c:a", "aac", "-b:a", "128k",
+        "-shortest", "-movflags", "+faststart",
+        path,
+    ])
+
+
+def generate_hls(source_path: str, output_dir: str, segment_seconds: int = 2) -> str:
+    """将已有视频切分为 HLS（不重新编码），返回 m3u8 路径"""
+    os.makedirs(output_dir, exist_ok=True)
+    playlist_path = os.path.join(output_dir, "index.m3u8")
+    _run_ffmpeg([
+        "-i", source_path,
+        "-c", "copy",
+        "-f", "hls", "-hls_time", str(segment_seconds), "-hls_playlist_type", "vod",
+        "-hls_segment_filename", os.path.join(output_dir, "seg_%03d.ts"),
+        playlist_path,
+    ])
+    return playlist_path
+
+
+def generate_random(path: str, size_mb: float):
+    """生成随机数据文件（不是有效的媒体文件，只能用于测量下载传输）"""
+    remaining = int(size_mb * 1024 * 1024)
+    with open(path, "wb") as f:
+        while remaining > 0:
+            chunk = min(remaining, 1024 * 1024)
+            f.write(os.urandom(chunk))
+            remaining -= chunk
+
+
+def prepare_media(media_dir: str, duration: float, size_mb: float, with_hls: bool = True) -> List[str]:
+    """
+    在 media_dir 中准备测试媒体
+
+    Returns:
+        相对于 media_dir 的媒体路径列表（MP4 在前，HLS 为 m3u8 路径）
+    """
+    os.makedirs(media_dir, exist_ok=True)
+    if not ffmpeg_available():
+        generate_random(os.path.join(media_dir, "random.mp4"), size_mb)
+        return ["random.mp4"]
+
+    generate_mp4(os.path.join(media_dir, "testsrc.mp4"), duration)
+    media = ["testsrc.mp4"]
+    if with_hls:
+        generate_hls(os.path.join(media_dir, "testsrc.mp4"), os.path.join(media_dir, "hls"))
+        media.append("hls/index.m3u8")
+    return media
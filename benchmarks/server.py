@@ -0,0 +1,152 @@
+"""
+基准测试本地服务器
+- /media/<路径>: 静态媒体文件，支持 Range 请求（断点续传和分片下载）
+- /watch/<视频ID>: 标题页面，页面中标明该视频使用的媒体文件
+- /api/playlist?count=N&page=P&size=S: 分页返回合集中的视频ID
+"""
+
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+def video_id(index: int) -> str:
+    return f"v{index:05d}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path.startswith("/media/"):
+            self._send_media(unquote(parsed.path[len("/media/"):]))
+        elif parsed.path.startswith("/watch/"):
+            self._send_watch_page(parsed.path[len("/watch/"):])
+        elif parsed.path == "/api/playlist":
+            self._send_playlist_page(parse_qs(parsed.query))
+        else:
+            self._send_bytes(404, b"not found", "text/plain")
+
+    def _send_bytes(self, status: int, body: bytes, content_type: str, headers: Optional[dict] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_watch_page(self, vid: str):
+        match = re.fullmatch(r"v(\d+)", vid)
+        if not match:
+            self._send_bytes(404, b"not found", "text/plain")
+            return
+        media = self.server.media[int(match.group(1)) % len(self.server.media)]
+        body = (
+            f"<html><head><title>Benchmark video {vid}</title></head>"
+            f"<body><video data-media=\"/media/{media}\"></video></body></html>"
+        ).encode("utf-8")
+        self._send_bytes(200, body, "text/html; charset=utf-8")
+
+    def _send_playlist_page(self, query: dict):
+        count = int(query.get("count", ["0"])[0])
+        page = int(query.get("page", ["0"])[0])
+        size = int(query.get("size", ["50"])[0])
+        ids = [video_id(index) for index in range(page * size, min((page + 1) * size, count))]
+        self._send_bytes(200, json.dumps({"ids": ids, "count": count}).encode("utf-8"), "application/json")
+
+    def _send_media(self, relative_path: str):
+        path = os.path.realpath(os.path.join(self.server.media_dir, relative_path))
+        if not path.startswith(self.server.media_dir + os.sep) or not os.path.isfile(path):
+            self._send_bytes(404, b"not found", "text/plain")
+            return
+
+        file_size = os.path.getsize(path)
+        start, end = 0, file_size - 1
+        status = 200
+        range_match = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+        if range_match and (range_match.group(1) or range_match.group(2)):
+            if range_match.group(1):
+                start = int(range_match.group(1))
+                if range_match.group(2):
+                    end = min(int(range_match.group(2)), file_size - 1)
+            else:
+                start = max(0, file_size - int(range_match.group(2)))
+            if start >= file_size:
+                self._send_bytes(416, b"", "text/plain", {"Content-Range": f"bytes */{file_size}"})
+                return
+            status = 206
+
+        content_type = "application/vnd.apple.mpegurl" if path.endswith(".m3u8") else (
+            "video/mp2t" if path.endswith(".ts") else "video/mp4"
+        )
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{file_size}")
+        self.end_headers()
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(remaining, 256 * 1024))
+                if not chunk:
+                    break
+                try:
+                    self.wfile.write(chunk)
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+                remaining -= len(chunk)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, media_dir: str, media: List[str]):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.media_dir = os.path.realpath(media_dir)
+        self.media = media
+
+
+class BenchmarkServer:
+    """在后台线程中运行的本地测试服务器（上下文管理器）"""
+
+    def __init__(self, media_dir: str, media: List[str]):
+        """
+        Args:
+            media_dir: 媒体文件目录
+            media: 相对于 media_dir 的媒体路径，按视频序号轮流分配给各个视频
+        """
+        self._server = _Server(media_dir, media)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="benchmark-server", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def playlist_url(self, count: int) -> str:
+        return f"{self.base_url}/playlist/{count}"
+
+    def watch_url(self, index: int) -> str:
+        return f"{self.base_url}/watch/{video_id(index)}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,66 @@
+"""
+基准测试结果统计
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法计算分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+@dataclass
+class StageResult:
+    """单个阶段的测量结果"""
+    name: str
+    items: int = 0
+    bytes: int = 0
+    wall_seconds: float = 0.0
+    latencies: List[float] = field(default_factory=list)  # 每个条目或每次调用的耗时（秒）
+    note: str = ''
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.wall_seconds if self.wall_seconds else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes / 1024 / 1024 / self.wall_seconds if self.wall_seconds else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'items': self.items,
+            'bytes': self.bytes,
+            'wall_seconds': round(self.wall_seconds, 4),
+            'items_per_second': round(self.items_per_second, 2),
+            'mb_per_second': round(self.mb_per_second, 2),
+            'latency_ms': {
+                f'p{pct}': round(percentile(self.latencies, pct) * 1000, 1) for pct in (50, 90, 99)
+            } | {'max': round(max(self.latencies, default=0) * 1000, 1)},
+            'note': self.note,
+        }
+
+
+def format_report(results: List[StageResult]) -> str:
+    """文本表格形式的报告"""
+    header = f"{'阶段':<22}{'条目':>7}{'条目/秒':>10}{'MB/秒':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        data = result.to_dict()
+        latency = data['latency_ms']
+        line = (
+            f"{result.name:<22}{result.items:>7}{data['items_per_second']:>10.2f}{data['mb_per_second']:>9.2f}"
+            f"{latency['p50']:>10.1f}{latency['p90']:>10.1f}{latency['p99']:>10.1f}{latency['max']:>10.1f}"
+        )
+        if result.note:
+            line += f"  ({result.note})"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,128 @@
+"""
+下载存档模块
+按“提取器+视频ID”记录已下载的视频，分析合集时即可标记已下载条目，下载前跳过，无需再次访问网站
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from settings import get_cache_dir
+
+
+def make_archive_id(extractor: Optional[str], video_id: Optional[str]) -> Optional[str]:
+    """存档ID，与 yt-dlp 的格式一致（'提取器名小写 视频ID'）"""
+    if not extractor or not video_id:
+        return None
+    return f"{extractor.lower()} {video_id}"
+
+
+def entry_archive_id(entry: Dict) -> Optional[str]:
+    """从扁平解析的合集条目（ie_key）或完整解析结果（extractor_key）得到存档ID"""
+    return make_archive_id(entry.get('extractor_key') or entry.get('ie_key'), entry.get('id'))
+
+
+class DownloadArchive:
+    """
+    基于SQLite的下载存档（线程安全）
+    实现了 in / add，可直接作为 yt-dlp 的 download_archive 参数使用
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            path = os.path.join(get_cache_dir(), "archive.sqlite3")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS archive ("
+            " archive_id TEXT PRIMARY KEY,"
+            " added REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def __contains__(self, archive_id) -> bool:
+        if not archive_id:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM archive WHERE archive_id = ?", (archive_id,)
+            ).fetchone()
+        return row is not None
+
+    def __bool__(self) -> bool:
+        # yt-dlp 在存档为空时跳过检查，这里始终参与检查
+        return True
+
+    def __repr__(self) -> str:
+        # 下载引擎按参数的字符串形式区分实例池，需保持稳定
+        return f"DownloadArchive({self.path!r})"
+
+    def add(self, archive_id: str):
+        """记录一个已下载的视频"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO archive (archive_id, added) VALUES (?, ?)",
+                (archive_id, time.time())
+            )
+            self._conn.commit()
+
+    def downloaded(self, archive_ids: Iterable[Optional[str]]) -> Set[str]:
+        """批量查询，返回其中已下载的存档ID"""
+        archive_ids = [archive_id for archive_id in archive_ids if archive_id]
+        found = set()
+        with self._lock:
+            # 分批查询，避免超出SQLite的参数个数限制
+            for start in range(0, len(archive_ids), 500):
+                chunk = archive_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT archive_id FROM archive WHERE archive_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                found.update(archive_id for (archive_id,) in rows)
+        return found
+
+    def remove(self, archive_id: str):
+        """删除一条记录（如文件被删除后需要重新下载）"""
+        with self._lock:
+            self._conn.execute("DELETE FROM archive WHERE archive_id = ?", (archive_id,))
+            self._conn.commit()
+
+    def record_only(self) -> '_RecordOnlyArchive':
+        """只写不查的存档视图：作为 yt-dlp 的 download_archive 时总是下载，完成后仍写入存档"""
+        return _RecordOnlyArchive(self)
+
+
+class _RecordOnlyArchive:
+    """DownloadArchive 的只写视图（强制重新下载时使用）"""
+
+    def __init__(self, archive: DownloadArchive):
+        self.archive = archive
+
+    def __contains__(self, archive_id) -> bool:
+        return False
+
+    def __bool__(self) -> bool:
+        return True
+
+    def __repr__(self) -> str:
+        return f"{self.archive!r}.record_only()"
+
+    def add(self, archive_id: str):
+        self.archive.add(archive_id)
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_download_archive() -> DownloadArchive:
+    """获取进程内共享的下载存档"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = DownloadArchive()
+        return _archive
@@ -0,0 +1,287 @@
+"""
+进程内下载引擎模块
+复用常驻的 yt_dlp.YoutubeDL 实例，避免每个视频都启动一个新的 Python 解释器
+"""
+
+import itertools
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import yt_dlp
+from yt_dlp.utils import DownloadError, PagedList, YoutubeDLError
+
+from bandwidth import get_bandwidth_governor
+from settings import get_empty_cookie_jar, load_cookies
+from turbo import RangeSplitPP, ytdlp_params
+
+
+# 优化的清晰度选择策略：优先1080p，然后向下寻找最高可用清晰度
+# 1. 首选1080p (height=1080)
+# 2. 如果没有1080p，选择小于等于1080p的最高清晰度
+# 3. 确保音视频都有
+FORMAT_SELECTOR = (
+    "bestvideo[height=1080]+bestaudio/bestvideo[height<=1080]+bestaudio/"
+    "best[height=1080]/best[height<=1080]/best"
+)
+
+# 流式枚举合集时每页的条目数
+DEFAULT_PAGE_SIZE = 50
+# 跟随跳转类结果（短链接、频道主页等）的最大次数
+MAX_URL_REDIRECTS = 5
+
+
+class _PooledYoutubeDL:
+    """池中的 YoutubeDL 实例，附带当前借用者的回调列表"""
+
+    def __init__(self, params: Dict, extractors: Iterable[type] = ()):
+        self.progress_listeners = []
+        self.postprocessor_listeners = []
+        self.ydl = yt_dlp.YoutubeDL({
+            **params,
+            'progress_hooks': [self._dispatch_progress],
+            'postprocessor_hooks': [self._dispatch_postprocessor],
+        }, auto_init=False)
+        # 额外注册的提取器排在内置提取器（尤其是匹配一切URL的 generic）之前
+        for extractor in extractors:
+            self.ydl.add_info_extractor(extractor())
+        self.ydl.add_default_info_extractors()
+        # 高速模式下把渐进式文件改为 Range 分段下载（未启用 range_split 参数时不做任何事）
+        self.ydl.add_post_processor(RangeSplitPP(self.ydl), when='before_dl')
+
+    def use_cookiejar(self, jar):
+        """使用共享的 cookie jar（替代 cookiefile 参数，避免每个实例各自解析并回写文件）"""
+        if self.ydl.__dict__.get('cookiejar') is jar:
+            return
+        # 网络请求处理器在创建时绑定 cookie jar，更换 jar 时需要重新创建
+        director = self.ydl.__dict__.pop('_request_director', None)
+        if director is not None:
+            director.close()
+        self.ydl.cookiejar = jar
+
+    def _dispatch_progress(self, status: Dict):
+        for listener in list(self.progress_listeners):
+            listener(status)
+
+    def _dispatch_postprocessor(self, status: Dict):
+        for listener in list(self.postprocessor_listeners):
+            listener(status)
+
+
+class DownloadEngine:
+    """基于常驻 YoutubeDL 实例池的下载引擎（线程安全）"""
+
+    def __init__(self, max_idle_per_key: int = 4):
+        self.max_idle_per_key = max_idle_per_key
+        self.extractors: List[type] = []
+        self._idle: Dict[str, List[_PooledYoutubeDL]] = {}
+        self._lock = threading.Lock()
+
+    def register_extractor(self, extractor: type):
+        """
+        注册额外的 yt-dlp 提取器类（如离线基准测试使用的本地站点），优先于内置提取器匹配
+        已在池中的空闲实例会被丢弃，之后借出的实例都包含该提取器
+        """
+        with self._lock:
+            if extractor in self.extractors:
+                return
+            self.extractors.append(extractor)
+            idle = [pooled for pooled_list in self._idle.values() for pooled in pooled_list]
+            self._idle.clear()
+        for pooled in idle:
+            pooled.ydl.close()
+
+    def _base_params(self, quiet: bool = True) -> Dict:
+        return {
+            'quiet': quiet,
+            'no_warnings': quiet,
+            'noprogress': quiet,
+            'socket_timeout': 30,
+        }
+
+    @contextmanager
+    def _checkout(self, params: Dict, cookies_path: Optional[str] = None,
+                  progress_hook=None, postprocessor_hook=None) -> Iterator[yt_dlp.YoutubeDL]:
+        """从池中借出一个参数相同的实例，用完后归还"""
+        key = json.dumps(params, sort_keys=True, default=str)
+        with self._lock:
+            idle = self._idle.get(key)
+            pooled = idle.pop() if idle else None
+        if pooled is None:
+            pooled = _PooledYoutubeDL(params, list(self.extractors))
+
+        # cookies 按域名区分，与标题获取的 HTTP 客户端共用同一个 jar
+        pooled.use_cookiejar(load_cookies(cookies_path) if cookies_path else get_empty_cookie_jar())
+        if progress_hook:
+            pooled.progress_listeners.append(progress_hook)
+        if postprocessor_hook:
+            pooled.postprocessor_listeners.append(postprocessor_hook)
+        try:
+            yield pooled.ydl
+        finally:
+            pooled.progress_listeners.clear()
+            pooled.postprocessor_listeners.clear()
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle_per_key:
+                    idle.append(pooled)
+                    pooled = None
+            if pooled is not None:
+                pooled.ydl.close()
+
+    def iter_entries(self, url: str, cookies_path: Optional[str] = None, page_size: int = DEFAULT_PAGE_SIZE,
+                     max_entries: Optional[int] = None) -> Iterator[Tuple[Dict, List[Dict]]]:
+        """
+        流式枚举URL中的条目：不处理条目本身（类似 --flat-playlist），按页边获取边产出，
+        不需要等整个合集解析完成，也不会把全部结果一次性放入内存
+
+        Args:
+            url: 视频或合集URL
+            cookies_path: cookies文件路径
+            page_size: 每页条目数
+            max_entries: 最多枚举的条目数，默认不限制
+
+        Yields:
+            (合集信息（不含entries）, 本页条目列表)；URL不是合集时只产出一次 (视频信息, [])
+
+        Raises:
+            DownloadError: 解析失败，包括枚举到后续页时才发生的错误（此前已产出的页仍然有效）
+        """
+        with self._checkout(self._base_params(), cookies_path) as ydl:
+            info = ydl.extract_info(url, download=False, process=False)
+            for _ in range(MAX_URL_REDIRECTS):
+                if not info or info.get('_type') not in ('url', 'url_transparent'):
+                    break
+                info = ydl.extract_info(info['url'], download=False, process=False, ie_key=info.get('ie_key'))
+            if not info:
+                return
+
+            summary = ydl.sanitize_info({key: value for key, value in info.items() if key != 'entries'})
+            if info.get('_type') not in ('playlist', 'multi_video'):
+                yield summary, []
+                return
+            # 后续页在迭代时才请求，提取器抛出的 ExtractorError 等不会被 extract_info 包装，这里统一转换
+            try:
+                for page in _paginate(info.get('entries') or [], max(1, page_size), max_entries):
+                    yield summary, [ydl.sanitize_info(entry) for entry in page if entry]
+            except DownloadError:
+                raise
+            except YoutubeDLError as e:
+                raise DownloadError(str(e)) from e
+
+    def extract_title(self, url: str, cookies_path: Optional[str] = None) -> Optional[str]:
+        """只解析不下载，获取视频（或播放列表）标题"""
+        params = self._base_params()
+        params['extract_flat'] = 'in_playlist'
+        with self._checkout(params, cookies_path) as ydl:
+            info = ydl.extract_info(url, download=False, process=False)
+            return info.get('title') if info else None
+
+    def download(self, url: str, download_folder: str, cookies_path: Optional[str] = None,
+                 quiet: bool = False, progress_hook=None, postprocessor_hook=None, download_archive=None,
+                 transfer: Optional[Dict] = None):
+        """
+        下载单个视频，失败时抛出 DownloadError
+
+        Args:
+            url: 视频URL
+            download_folder: 下载目录
+            cookies_path: cookies文件路径
+            quiet: 是否关闭 yt-dlp 自身的控制台输出
+            progress_hook: yt-dlp 下载进度回调
+            postprocessor_hook: yt-dlp 后处理（合并、嵌入封面）回调
+            download_archive: 下载存档（支持 in / add 的集合），已在存档中的视频直接跳过，
+                              下载完成后由 yt-dlp 写入存档
+            transfer: 高速传输配置（turbo.resolve_profile 的返回值），None 表示单连接下载
+
+        Returns:
+            合并、嵌入封面等后处理完成后的最终文件路径列表（URL为合集时包含多个），
+            视频已在存档中时返回空列表
+        """
+        params = self._base_params(quiet=quiet)
+        params.update({
+            'format': FORMAT_SELECTOR,
+            'outtmpl': os.path.join(download_folder, "%(title)s.%(ext)s"),
+            'merge_output_format': 'mp4',
+            # 从已有的 .part 文件续传（任务恢复时依赖此项）
+            'continuedl': True,
+            'writethumbnail': True,
+            'postprocessors': [{'key': 'EmbedThumbnail', 'already_have_thumbnail': False}],
+        })
+        params.update(ytdlp_params(transfer))
+        if download_archive is not None:
+            params['download_archive'] = download_archive
+        # 所有下载共用全局带宽限额：在进度回调中按传输的字节数取令牌
+        throttle = get_bandwidth_governor().progress_hook(url)
+
+        def on_progress(status):
+            throttle(status)
+            if progress_hook:
+                progress_hook(status)
+
+        with self._checkout(params, cookies_path, on_progress, postprocessor_hook) as ydl:
+            info = ydl.extract_info(url, download=True)
+            filepaths = _collect_filepaths(info)
+            if filepaths:
+                return filepaths
+            # 存档命中时 yt-dlp 不下载：解析前命中返回None，解析后命中返回没有文件的信息
+            if download_archive is not None and (info is None or ydl.in_download_archive(info)):
+                return []
+            raise DownloadError(f"下载失败: {url}")
+
+    def version(self) -> str:
+        """yt-dlp 版本号"""
+        return yt_dlp.version.__version__
+
+
+def _paginate(entries: Iterable, page_size: int, max_entries: Optional[int]) -> Iterator[List]:
+    """将惰性的条目序列按页切分；分页接口（PagedList）只请求需要的页"""
+    if isinstance(entries, PagedList):
+        start = 0
+        while max_entries is None or start < max_entries:
+            end = start + page_size if max_entries is None else min(start + page_size, max_entries)
+            page = entries.getslice(start, end)
+            if not page:
+                return
+            yield page
+            if len(page) < end - start:
+                return
+            start = end
+        return
+
+    iterator = iter(entries)
+    if max_entries is not None:
+        iterator = itertools.islice(iterator, max_entries)
+    while True:
+        page = list(itertools.islice(iterator, page_size))
+        if not page:
+            return
+        yield page
+
+
+def _collect_filepaths(info: Optional[Dict]) -> List[str]:
+    """从 extract_info 的结果中收集最终文件路径（后处理移动文件后的 filepath）"""
+    if not info:
+        return []
+    if info.get('_type') == 'playlist':
+        filepaths = []
+        for entry in info.get('entries') or []:
+            filepaths.extend(_collect_filepaths(entry))
+        return filepaths
+    downloads = info.get('requested_downloads') or [info]
+    return [download['filepath'] for download in downloads if download.get('filepath')]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> DownloadEngine:
+    """获取进程内共享的下载引擎"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = DownloadEngine()
+        return _engine
@@ -0,0 +1,171 @@
+"""
+下载调度模块
+在全局并发数和按站点的并发上限内并行执行下载任务，并逐项返回结果
+并发名额由进程内共享的调度器统一分配：同时运行的多个下载任务（如Web界面的多个后台任务）
+合计不超过配置的上限
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, Optional
+from urllib.parse import urlparse
+
+from settings import load_config
+
+
+DEFAULT_MAX_WORKERS = 3
+DEFAULT_HOST_LIMITS = {
+    'bilibili.com': 3,
+}
+# 检查config.json是否修改的间隔（秒）
+CONFIG_CHECK_INTERVAL = 1.0
+
+
+class DownloadScheduler:
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS,
+                 host_limits: Optional[Dict[str, int]] = None,
+                 default_host_limit: Optional[int] = None):
+        """
+        Args:
+            max_workers: 同时进行的下载总数（该调度器上所有 run 调用合计）
+            host_limits: 按域名的并发上限，如 {"bilibili.com": 3}，子域名共享同一上限
+            default_host_limit: 未在 host_limits 中配置的站点的并发上限，None 表示不单独限制
+        """
+        # 名额计数：每释放一个名额 generation 加一并唤醒等待的 run 调用
+        self._slots = threading.Condition()
+        self._active = 0
+        self._host_active: Dict[str, int] = {}
+        self._generation = 0
+        self._config = None
+        self._config_checked = 0.0
+        self.configure(max_workers, host_limits, default_host_limit)
+
+    def configure(self, max_workers: int = DEFAULT_MAX_WORKERS,
+                  host_limits: Optional[Dict[str, int]] = None,
+                  default_host_limit: Optional[int] = None):
+        """修改并发上限；正在进行的下载不受影响，新上限在分配下一个名额时生效"""
+        with self._slots:
+            self.max_workers = max(1, int(max_workers))
+            self.host_limits = {
+                domain.lower().lstrip('.'): max(1, int(limit))
+                for domain, limit in (DEFAULT_HOST_LIMITS if host_limits is None else host_limits).items()
+            }
+            self.default_host_limit = default_host_limit
+            self._slots.notify_all()
+
+    def reload_config(self, force: bool = False):
+        """config.json修改后重新读取并发上限"""
+        now = time.monotonic()
+        if not force and now - self._config_checked < CONFIG_CHECK_INTERVAL:
+            return
+        self._config_checked = now
+        config = load_config()
+        if config is self._config and not force:
+            return
+        self._config = config
+        self.configure(
+            config.get('max_workers', DEFAULT_MAX_WORKERS),
+            config.get('host_limits'),
+            config.get('default_host_limit')
+        )
+
+    def host_key(self, url: str) -> str:
+        """获取用于并发计数的站点键（匹配到的配置域名，否则为主机名）"""
+        host = (urlparse(url).hostname or '').lower()
+        for domain in self.host_limits:
+            if host == domain or host.endswith('.' + domain):
+                return domain
+        return host
+
+    def limit_for(self, key: str) -> Optional[int]:
+        """获取站点的并发上限"""
+        return self.host_limits.get(key, self.default_host_limit)
+
+    def _try_acquire(self, key: str) -> bool:
+        """在全局和站点上限内占用一个名额，没有空闲名额时立即返回False"""
+        with self._slots:
+            limit = self.limit_for(key)
+            if self._active >= self.max_workers or \
+                    (limit is not None and self._host_active.get(key, 0) >= limit):
+                return False
+            self._active += 1
+            self._host_active[key] = self._host_active.get(key, 0) + 1
+            return True
+
+    def _release(self, key: str):
+        with self._slots:
+            self._active -= 1
+            self._host_active[key] -= 1
+            if not self._host_active[key]:
+                del self._host_active[key]
+            self._generation += 1
+            self._slots.notify_all()
+
+    def run(self, items: Iterable, worker: Callable,
+            url_getter: Callable = lambda item: item['url'],
+            max_workers: Optional[int] = None) -> Iterator[Dict]:
+        """
+        并行执行下载任务，按完成顺序逐项产出结果；单项失败不会中断其余任务
+
+        Args:
+            items: 待下载的任务列表
+            worker: 执行单个任务的函数，失败时抛出异常
+            url_getter: 从任务中取得URL的函数，用于按站点限流
+            max_workers: 本次调用最多同时进行的下载数（仍受调度器的全局名额限制），默认不单独限制
+
+        Yields:
+            {'item': 任务, 'success': 是否成功, 'result': worker返回值, 'error': 错误信息}
+        """
+        # 按站点分组排队，保持各站点内部的原始顺序
+        pending = OrderedDict()
+        for item in items:
+            pending.setdefault(self.host_key(url_getter(item) or ''), deque()).append(item)
+
+        cap = max(1, int(max_workers or self.max_workers))
+        active = {}
+
+        with ThreadPoolExecutor(max_workers=cap) as executor:
+            while pending or active:
+                with self._slots:
+                    generation = self._generation
+                for key in list(pending):
+                    queue = pending[key]
+                    while queue and len(active) < cap and self._try_acquire(key):
+                        item = queue.popleft()
+                        future = executor.submit(worker, item)
+                        active[future] = item
+                        # 任务结束（结果已可读取）后才释放名额，等待中的调用被唤醒时能看到已完成的任务
+                        future.add_done_callback(lambda _, key=key: self._release(key))
+                    if not queue:
+                        del pending[key]
+
+                done = [future for future in active if future.done()]
+                if not done:
+                    # 等待任意名额释放：本次调用的任务完成，或其他调用释放了名额
+                    with self._slots:
+                        self._slots.wait_for(lambda: self._generation != generation)
+                    continue
+                for future in done:
+                    item = active.pop(future)
+                    try:
+                        yield {'item': item, 'success': True, 'result': future.result(), 'error': None}
+                    except Exception as e:
+                        yield {'item': item, 'success': False, 'result': None, 'error': str(e)}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_download_scheduler() -> DownloadScheduler:
+    """获取进程内共享的下载调度器（并发上限读取config.json，修改后自动生效）"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = DownloadScheduler()
+            _scheduler.reload_config(force=True)
+        scheduler = _scheduler
+    scheduler.reload_config()
+    return scheduler
@@ -0,0 +1,118 @@
+"""
+音频提取清单模块
+按“源视频路径 + 大小 + 修改时间 + 编码设置”记录已提取的音频，重复运行批量提取时
+只处理新增或修改过的视频；输出文件被删除或修改后也会重新提取
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+from settings import get_cache_dir
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """文件的 (大小, 修改时间ns)，文件不存在时返回None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class ExtractionManifest:
+    """基于SQLite的提取清单（线程安全），所有目录共用一个中央索引"""
+
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            path = os.path.join(get_cache_dir(), "extraction.sqlite3")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            " source TEXT NOT NULL,"
+            " settings TEXT NOT NULL,"
+            " source_size INTEGER NOT NULL,"
+            " source_mtime_ns INTEGER NOT NULL,"
+            " output TEXT NOT NULL,"
+            " output_size INTEGER NOT NULL,"
+            " output_mtime_ns INTEGER NOT NULL,"
+            " extracted REAL NOT NULL,"
+            " PRIMARY KEY (source, settings))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _key(source: str) -> str:
+        return os.path.normcase(os.path.realpath(source))
+
+    def lookup(self, source: str, settings: str,
+               signature: Optional[Tuple[int, int]] = None) -> Optional[str]:
+        """
+        查询源视频在该编码设置下是否已提取且结果仍然有效
+
+        Args:
+            source: 源视频路径
+            settings: 编码设置的字符串表示
+            signature: 源文件的 (大小, 修改时间ns)，默认现场读取
+
+        Returns:
+            有效的输出文件路径；未提取过、源文件或输出文件已变化时返回None
+        """
+        signature = signature or file_signature(source)
+        if signature is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source_size, source_mtime_ns, output, output_size, output_mtime_ns"
+                " FROM extractions WHERE source = ? AND settings = ?",
+                (self._key(source), settings)
+            ).fetchone()
+        if row is None or tuple(row[:2]) != signature:
+            return None
+        output = row[2]
+        if file_signature(output) != (row[3], row[4]):
+            return None
+        return output
+
+    def record(self, source: str, settings: str, output: str, signature: Tuple[int, int]):
+        """
+        记录一次成功的提取
+
+        Args:
+            signature: 提取开始前源文件的 (大小, 修改时间ns)；提取后可能删除源文件，因此由调用方事先读取
+        """
+        output_signature = file_signature(output)
+        if output_signature is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions"
+                " (source, settings, source_size, source_mtime_ns, output, output_size, output_mtime_ns, extracted)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._key(source), settings, *signature, output, *output_signature, time.time())
+            )
+            self._conn.commit()
+
+    def remove(self, source: str):
+        """删除源视频的所有记录（下次强制重新提取）"""
+        with self._lock:
+            self._conn.execute("DELETE FROM extractions WHERE source = ?", (self._key(source),))
+            self._conn.commit()
+
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def get_extraction_manifest() -> ExtractionManifest:
+    """获取进程内共享的提取清单"""
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = ExtractionManifest()
+        return _manifest
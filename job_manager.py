@@ -0,0 +1,204 @@
+"""
+后台任务管理模块
+下载任务在后台线程中运行，Web请求只根据任务ID读取进度，不再占用请求线程等待任务结束
+"""
+
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+from metrics import ACTIVE_TASKS, JOBS, STAGE_DURATION
+
+
+class Job:
+    """单个后台任务的状态与进度消息"""
+
+    def __init__(self, job_id: str, description: str = ''):
+        self.id = job_id
+        self.description = description
+        self.status = 'pending'  # pending / running / finished / failed
+        self.messages: List[str] = []
+        self.progress = ''  # 实时进度文本，不计入消息记录，每次更新整体替换
+        self.version = 0    # 消息或进度每变化一次加一
+        self.result: Optional[str] = None
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self._condition = threading.Condition()
+
+    def report(self, message: str):
+        """追加一条进度消息并唤醒等待者（可在任意线程调用）"""
+        with self._condition:
+            self.messages.append(message)
+            self.version += 1
+            self._condition.notify_all()
+
+    def set_progress(self, text: str):
+        """替换实时进度文本并唤醒等待者（可在任意线程调用）"""
+        with self._condition:
+            if text == self.progress:
+                return
+            self.progress = text
+            self.version += 1
+            self._condition.notify_all()
+
+    def _finish(self, status: str, result: str):
+        with self._condition:
+            self.status = status
+            self.result = result
+            self.progress = ''
+            self.finished = time.time()
+            self._condition.notify_all()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ('finished', 'failed')
+
+    def wait_for_update(self, seen_version: int, timeout: float) -> bool:
+        """等待新消息、进度变化或任务结束，返回是否有更新"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self.version > seen_version or self.done, timeout)
+
+    def render(self, max_lines: int) -> str:
+        """最近的消息加上当前实时进度"""
+        with self._condition:
+            lines = self.messages[-max_lines:]
+            if self.progress:
+                lines = [*lines, '', self.progress] if lines else [self.progress]
+            return "\n".join(lines)
+
+    def snapshot(self) -> Dict:
+        """任务状态快照"""
+        with self._condition:
+            return {
+                'id': self.id,
+                'description': self.description,
+                'status': self.status,
+                'message_count': len(self.messages),
+                'last_message': self.messages[-1] if self.messages else '',
+                'result': self.result,
+                'created': self.created,
+                'finished': self.finished,
+            }
+
+
+class JobManager:
+    """管理后台任务：提交、查询状态、流式读取进度"""
+
+    def __init__(self, max_finished_jobs: int = 50):
+        self.max_finished_jobs = max_finished_jobs
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, target: Callable, *args, description: str = '', job_id: Optional[str] = None) -> str:
+        """
+        在后台线程中运行任务
+
+        Args:
+            target: 任务函数，调用方式为 target(job, *args)，通过 job.report / job.set_progress
+                    报告进度，返回最终结果文本
+            description: 任务描述，用于任务列表显示
+            job_id: 指定任务ID（如使用持久化记录中的ID），默认自动生成
+
+        Returns:
+            任务ID
+        """
+        job = Job(job_id or uuid.uuid4().hex[:8], description)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+
+        JOBS.inc(status='submitted')
+
+        def run():
+            job.status = 'running'
+            started = time.perf_counter()
+            try:
+                with ACTIVE_TASKS.track(stage='job'):
+                    result = target(job, *args)
+                job._finish('finished', result)
+            except Exception as e:
+                traceback.print_exc()
+                error_msg = f"❌ 处理失败: {str(e)}"
+                job.report(error_msg)
+                job._finish('failed', error_msg)
+            JOBS.inc(status=job.status)
+            STAGE_DURATION.observe(time.perf_counter() - started, stage='job')
+
+        threading.Thread(target=run, name=f"job-{job.id}", daemon=True).start()
+        return job.id
+
+    def _prune(self):
+        """只保留最近的若干个已结束任务"""
+        finished = sorted((job for job in self._jobs.values() if job.done), key=lambda job: job.created)
+        for job in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """查询单个任务的状态，任务不存在时返回None"""
+        job = self.get(job_id)
+        return job.snapshot() if job else None
+
+    def list_jobs(self) -> List[Dict]:
+        """所有任务的状态，最新的在前"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.snapshot() for job in sorted(jobs, key=lambda job: job.created, reverse=True)]
+
+    def stream(self, job_id: str, poll_timeout: float = 1.0, max_lines: int = 200) -> Iterator[str]:
+        """
+        流式产出任务进度文本，每次有新消息或进度变化时产出一次，任务结束后产出最终结果并停止
+
+        Args:
+            job_id: 任务ID
+            poll_timeout: 等待新消息的超时时间（秒）
+            max_lines: 最多显示的最近消息条数
+        """
+        job = self.get(job_id)
+        if job is None:
+            yield f"❌ 任务不存在: {job_id}"
+            return
+
+        header = f"🆔 任务ID: {job.id}"
+        seen = -1
+        while not job.done:
+            job.wait_for_update(max(seen, 0), poll_timeout)
+            if job.version != seen and not job.done:
+                seen = job.version
+                yield "\n".join([header, job.render(max_lines)])
+
+        yield "\n".join([header, *job.messages[-max_lines:], job.result or ''])
+
+    def format_jobs(self) -> str:
+        """任务列表文本"""
+        jobs = self.list_jobs()
+        if not jobs:
+            return "暂无任务"
+        status_icons = {'pending': '⏳', 'running': '🔄', 'finished': '✅', 'failed': '❌'}
+        lines = []
+        for job in jobs:
+            created = datetime.fromtimestamp(job['created']).strftime("%H:%M:%S")
+            lines.append(
+                f"{status_icons.get(job['status'], '')} [{job['id']}] {created} {job['description']}"
+                f" - {job['last_message']}"
+            )
+        return "\n".join(lines)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """获取进程内共享的任务管理器"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
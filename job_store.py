@@ -0,0 +1,162 @@
+"""
+任务持久化模块
+将下载任务及其中每个视频的状态记录到本地SQLite，进程重启后可以继续未完成的任务
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from settings import get_cache_dir
+
+
+# 视频条目状态
+ITEM_QUEUED = 'queued'
+ITEM_DOWNLOADED = 'downloaded'
+ITEM_FAILED = 'failed'
+
+
+class JobStore:
+    """基于SQLite的下载任务记录（线程安全）"""
+
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            path = os.path.join(get_cache_dir(), "jobs.sqlite3")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " description TEXT NOT NULL DEFAULT '',"
+            " videos TEXT NOT NULL,"
+            " options TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " result TEXT,"
+            " created REAL NOT NULL,"
+            " updated REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS job_items ("
+            " job_id TEXT NOT NULL,"
+            " item_index INTEGER NOT NULL,"
+            " state TEXT NOT NULL,"
+            " filepaths TEXT NOT NULL DEFAULT '[]',"
+            " error TEXT,"
+            " updated REAL NOT NULL,"
+            " PRIMARY KEY (job_id, item_index));"
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);"
+        )
+        self._conn.commit()
+
+    def create_job(self, url: str, videos: List[Dict], selected_indices: List[int],
+                   options: Dict, description: str = '') -> str:
+        """
+        记录一个新任务及其全部待下载视频
+
+        Args:
+            url: 原始URL
+            videos: 分析得到的视频列表
+            selected_indices: 选中的视频索引
+            options: 重新执行任务所需的参数（下载目录、音频选项等）
+            description: 任务描述
+
+        Returns:
+            任务ID
+        """
+        job_id = uuid.uuid4().hex[:8]
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, url, description, videos, options, status, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, 'running', ?, ?)",
+                (job_id, url, description, json.dumps(videos, ensure_ascii=False),
+                 json.dumps(options, ensure_ascii=False), now, now)
+            )
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, item_index, state, updated) VALUES (?, ?, ?, ?)",
+                [(job_id, index, ITEM_QUEUED, now) for index in selected_indices]
+            )
+            self._conn.commit()
+        return job_id
+
+    def update_item(self, job_id: str, item_index: int, state: str,
+                    filepaths: Optional[List[str]] = None, error: Optional[str] = None):
+        """更新单个视频的状态和输出文件路径"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_items SET state = ?, filepaths = ?, error = ?, updated = ?"
+                " WHERE job_id = ? AND item_index = ?",
+                (state, json.dumps(filepaths or [], ensure_ascii=False), error, time.time(), job_id, item_index)
+            )
+            self._conn.commit()
+
+    def finish_job(self, job_id: str, result: str, status: str = 'finished'):
+        """标记任务结束"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, updated = ? WHERE id = ?",
+                (status, result, time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def unfinished_jobs(self) -> List[Dict]:
+        """
+        所有未结束的任务，附带其中仍未下载的视频索引，以及已下载视频的输出文件
+        （进程退出时这些视频的音频提取可能尚未完成，恢复时需要重新交给提取阶段）
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, url, description, videos, options FROM jobs WHERE status = 'running' ORDER BY created"
+            ).fetchall()
+            jobs = []
+            for job_id, url, description, videos, options in rows:
+                pending = []
+                downloaded = {}
+                for index, state, filepaths in self._conn.execute(
+                    "SELECT item_index, state, filepaths FROM job_items WHERE job_id = ? ORDER BY item_index",
+                    (job_id,)
+                ):
+                    if state == ITEM_QUEUED:
+                        pending.append(index)
+                    elif state == ITEM_DOWNLOADED:
+                        downloaded[index] = json.loads(filepaths)
+                jobs.append({
+                    'id': job_id,
+                    'url': url,
+                    'description': description,
+                    'videos': json.loads(videos),
+                    'options': json.loads(options),
+                    'pending_indices': pending,
+                    'downloaded_items': downloaded,
+                })
+        return jobs
+
+    def items(self, job_id: str) -> List[Dict]:
+        """任务中每个视频的状态"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_index, state, filepaths, error FROM job_items WHERE job_id = ? ORDER BY item_index",
+                (job_id,)
+            ).fetchall()
+        return [
+            {'index': index, 'state': state, 'filepaths': json.loads(filepaths), 'error': error}
+            for index, state, filepaths, error in rows
+        ]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """获取进程内共享的任务记录"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobStore()
+        return _store
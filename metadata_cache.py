@@ -0,0 +1,140 @@
+"""
+元数据缓存模块
+将合集解析结果和视频标题缓存到本地SQLite，重复分析同一URL时无需再次请求网络
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from settings import get_cache_dir
+
+
+DEFAULT_TTL = 6 * 60 * 60  # 6小时
+DEFAULT_MAX_ENTRIES = 1000
+
+# 分享链接中与内容无关的追踪参数
+TRACKING_PARAMS = {
+    'spm_id_from', 'vd_source', 'from_spmid', 'share_source', 'share_medium',
+    'share_plat', 'share_session_id', 'share_tag', 'share_from', 'bbid',
+    'si', 'feature', 'pp',
+}
+
+
+def normalize_key(url: str) -> str:
+    """
+    将URL规范化为缓存键：B站使用BV号，YouTube使用播放列表ID或视频ID，
+    其他网站去掉追踪参数和锚点后按参数名排序
+    """
+    url = url.strip()
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+    query = dict(parse_qsl(parsed.query))
+
+    if 'bilibili.com' in host or 'b23.tv' in host:
+        bv_match = re.search(r'BV([a-zA-Z0-9]+)', url)
+        if bv_match:
+            return f"bilibili:BV{bv_match.group(1)}"
+    elif 'youtube.com' in host or 'youtu.be' in host:
+        if query.get('list'):
+            return f"youtube:list:{query['list']}"
+        if query.get('v'):
+            return f"youtube:video:{query['v']}"
+        if 'youtu.be' in host and parsed.path.strip('/'):
+            return f"youtube:video:{parsed.path.strip('/')}"
+
+    cleaned_query = urlencode(sorted(
+        (name, value) for name, value in query.items()
+        if name not in TRACKING_PARAMS and not name.startswith('utm_')
+    ))
+    return urlunparse((parsed.scheme.lower(), host, parsed.path.rstrip('/'), '', cleaned_query, ''))
+
+
+class MetadataCache:
+    """带过期时间和容量上限的SQLite键值缓存（线程安全）"""
+
+    def __init__(self, path: Optional[str] = None, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        if path is None:
+            path = os.path.join(get_cache_dir(), "metadata.sqlite3")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS metadata ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS metadata_accessed ON metadata (accessed)")
+        self._conn.commit()
+
+    def get(self, namespace: str, url: str) -> Optional[Any]:
+        """读取缓存，不存在或已过期时返回None"""
+        key = normalize_key(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM metadata WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if now - created > self.ttl:
+                self._conn.execute("DELETE FROM metadata WHERE namespace = ? AND key = ?", (namespace, key))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE metadata SET accessed = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key)
+            )
+            self._conn.commit()
+        return json.loads(value)
+
+    def set(self, namespace: str, url: str, value: Any):
+        """写入缓存，超出容量时淘汰最久未访问的条目"""
+        key = normalize_key(url)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO metadata (namespace, key, value, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            self._conn.execute("DELETE FROM metadata WHERE created < ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM metadata WHERE rowid IN ("
+                " SELECT rowid FROM metadata ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM metadata")
+            self._conn.commit()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_metadata_cache() -> MetadataCache:
+    """获取进程内共享的元数据缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = MetadataCache()
+        return _cache
@@ -0,0 +1,249 @@
+"""
+运行指标模块
+进程内的计数器、仪表和直方图，以 Prometheus 文本格式通过独立的本地HTTP端口暴露，
+用于定位合集解析、标题获取、下载、合并、嵌入封面、音频提取等阶段的瓶颈
+"""
+
+import bisect
+import threading
+from abc import ABC, abstractmethod
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+
+# 阶段耗时直方图的默认分桶（秒）
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+DEFAULT_METRICS_PORT = 9862
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    metric_type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """指标的样本行（不含 HELP/TYPE 注释）"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _ScalarMetric(_Metric):
+    """每组标签对应一个数值的指标"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def _add(self, amount: float, labels: Dict[str, str]):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items]
+
+
+class Counter(_ScalarMetric):
+    """只增不减的计数器"""
+    metric_type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        self._add(amount, labels)
+
+
+class Gauge(_ScalarMetric):
+    """可增可减的当前值（如队列长度、进行中的任务数）"""
+    metric_type = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        self._add(amount, labels)
+
+    def dec(self, amount: float = 1, **labels):
+        self._add(-amount, labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """进入时加一，退出时减一"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """按分桶统计的观测值分布（如各阶段耗时）"""
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # 每组标签: [各分桶计数（非累计）, 总和, 总数]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """记录代码块的耗时（秒）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        lines = []
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(key + (('le', _format_value(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标已存在: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Prometheus 文本格式（version 0.0.4）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_DURATION = REGISTRY.register(Histogram(
+    'streamcraft_stage_duration_seconds',
+    '各处理阶段的耗时（enumerate/titles/title_http/title_ytdlp/video/download/merge/embed_thumbnail/postprocess/audio_extract/analyze/job）',
+    ['stage']
+))
+PLAYLIST_ENTRIES = REGISTRY.register(Counter(
+    'streamcraft_playlist_entries_total', '合集枚举得到的条目数'
+))
+TITLES = REGISTRY.register(Counter(
+    'streamcraft_titles_total', '获取的视频标题数，按来源区分（cache/batch/http/ytdlp/failed）', ['source']
+))
+DOWNLOADS = REGISTRY.register(Counter(
+    'streamcraft_downloads_total', '下载的视频数，按结果区分（success/failed/skipped）', ['result']
+))
+DOWNLOADED_BYTES = REGISTRY.register(Counter(
+    'streamcraft_downloaded_bytes_total', '下载传输的字节数'
+))
+AUDIO_EXTRACTIONS = REGISTRY.register(Counter(
+    'streamcraft_audio_extractions_total', '音频提取次数，按结果区分（success/failed/skipped）', ['result']
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'streamcraft_queue_depth', '等待处理的条目数（download/audio_extract）', ['queue']
+))
+ACTIVE_TASKS = REGISTRY.register(Gauge(
+    'streamcraft_active_tasks', '正在处理的条目数（download/audio_extract/job）', ['stage']
+))
+JOBS = REGISTRY.register(Counter(
+    'streamcraft_jobs_total', '后台任务数，按状态区分（submitted/finished/failed）', ['status']
+))
+
+
+def start_metrics_server(port: int = DEFAULT_METRICS_PORT, host: str = '127.0.0.1',
+                         registry: Optional[Registry] = None) -> 'ThreadingHTTPServer':
+    """在后台线程中启动指标HTTP服务（GET /metrics），返回服务器对象"""
+    # http.server 只在启动指标服务时才需要，不在导入本模块时加载
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registry = registry or REGISTRY
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
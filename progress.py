@@ -0,0 +1,148 @@
+"""
+下载进度模块
+将 yt-dlp 的进度回调转换为结构化的进度事件，并按固定频率合并后再推送给界面
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+
+# 后处理器名称与进度阶段的对应关系
+POSTPROCESSOR_PHASES = {
+    'Merger': 'merging',
+    'EmbedThumbnail': 'embedding',
+}
+
+PHASE_LABELS = {
+    'downloading': '📥 下载中',
+    'downloaded': '📂 已下载',
+    'merging': '🔄 合并音视频',
+    'embedding': '🖼️ 嵌入封面',
+    'postprocessing': '⚙️ 后处理',
+    'error': '❌ 出错',
+}
+
+
+def format_bytes(num_bytes: Optional[float]) -> str:
+    """将字节数格式化为易读的字符串"""
+    if num_bytes is None:
+        return '?'
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(num_bytes) < 1024 or unit == 'GB':
+            return f"{num_bytes:.1f}{unit}" if unit != 'B' else f"{int(num_bytes)}B"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f}GB"
+
+
+@dataclass
+class ProgressEvent:
+    """单个视频的一次进度更新"""
+    key: str                                # 视频在批次中的唯一标识
+    title: str
+    phase: str                              # downloading / downloaded / merging / embedding / postprocessing / error
+    downloaded_bytes: int = 0
+    total_bytes: Optional[int] = None
+    speed: Optional[float] = None           # 字节/秒
+    eta: Optional[float] = None             # 秒
+    filename: str = ''
+
+    @property
+    def percent(self) -> Optional[float]:
+        if self.total_bytes:
+            return min(100.0, self.downloaded_bytes * 100.0 / self.total_bytes)
+        return None
+
+    @classmethod
+    def from_ytdlp(cls, key: str, title: str, status: Dict) -> 'ProgressEvent':
+        """由 yt-dlp 的 progress_hooks 回调参数创建事件"""
+        phase = {'downloading': 'downloading', 'finished': 'downloaded'}.get(status.get('status'), 'error')
+        return cls(
+            key=key,
+            title=title,
+            phase=phase,
+            downloaded_bytes=status.get('downloaded_bytes') or 0,
+            total_bytes=status.get('total_bytes') or status.get('total_bytes_estimate'),
+            speed=status.get('speed'),
+            eta=status.get('eta'),
+            filename=status.get('filename') or '',
+        )
+
+    @classmethod
+    def from_postprocessor(cls, key: str, title: str, status: Dict) -> Optional['ProgressEvent']:
+        """由 yt-dlp 的 postprocessor_hooks 回调参数创建事件，只关注后处理开始"""
+        if status.get('status') != 'started':
+            return None
+        phase = POSTPROCESSOR_PHASES.get(status.get('postprocessor'), 'postprocessing')
+        return cls(key=key, title=title, phase=phase)
+
+    def format(self) -> str:
+        """单行进度文本"""
+        label = PHASE_LABELS.get(self.phase, self.phase)
+        if self.phase != 'downloading':
+            return f"{label}: {self.title}"
+        parts = [f"{label}: {self.title}"]
+        if self.percent is not None:
+            parts.append(f"{self.percent:.1f}%")
+        parts.append(f"({format_bytes(self.downloaded_bytes)}/{format_bytes(self.total_bytes)})")
+        if self.speed:
+            parts.append(f"{format_bytes(self.speed)}/s")
+        if self.eta is not None:
+            minutes, seconds = divmod(int(self.eta), 60)
+            parts.append(f"ETA {minutes:02d}:{seconds:02d}")
+        return " ".join(parts)
+
+
+class ProgressThrottle:
+    """
+    合并进度事件：每个视频只保留最新的一条，按固定频率整体推送；
+    阶段变化（如下载完成、开始合并）立即推送
+    """
+
+    def __init__(self, emit: Callable[[Dict[str, ProgressEvent]], None], interval: float = 0.25):
+        """
+        Args:
+            emit: 推送回调，参数为 {key: 最新事件} 的快照
+            interval: 两次推送的最小间隔（秒），默认每秒最多4次
+        """
+        self.emit = emit
+        self.interval = interval
+        self._latest: Dict[str, ProgressEvent] = {}
+        self._last_emit = 0.0
+        self._lock = threading.Lock()
+
+    def push(self, event: ProgressEvent):
+        """提交一个进度事件（可在任意线程调用）"""
+        with self._lock:
+            previous = self._latest.get(event.key)
+            self._latest[event.key] = event
+            now = time.monotonic()
+            phase_changed = previous is None or previous.phase != event.phase
+            if not phase_changed and now - self._last_emit < self.interval:
+                return
+            self._last_emit = now
+            snapshot = dict(self._latest)
+        self.emit(snapshot)
+
+    def finish(self, key: str):
+        """视频处理结束，不再显示其进度"""
+        with self._lock:
+            self._latest.pop(key, None)
+            snapshot = dict(self._latest)
+        self.emit(snapshot)
+
+    @staticmethod
+    def total_speed(events: Dict[str, ProgressEvent]) -> float:
+        """所有正在下载的视频的总速度（字节/秒）"""
+        return sum(event.speed or 0 for event in events.values() if event.phase == 'downloading')
+
+    @classmethod
+    def format(cls, events: Dict[str, ProgressEvent]) -> str:
+        """多行进度文本：总体吞吐 + 每个视频的最新状态"""
+        if not events:
+            return ''
+        active = sum(1 for event in events.values() if event.phase == 'downloading')
+        lines = [f"⚡ 进行中 {len(events)} 个（下载 {active} 个），总速度 {format_bytes(cls.total_speed(events))}/s"]
+        lines.extend(event.format() for event in events.values())
+        return "\n".join(lines)
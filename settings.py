@@ -0,0 +1,164 @@
+"""
+配置模块
+统一读取 config.json 和 cookies.txt：解析结果在内存中缓存，只有文件修改时间变化时才重新加载
+cookies 解析为按域名区分的 cookie jar，由 httpx 客户端和 yt-dlp 共用
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, Optional
+
+if TYPE_CHECKING:
+    # 只用于类型标注；http.cookiejar 会连带导入 urllib.request 等模块，不在启动时加载
+    from http.cookiejar import CookieJar
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(SCRIPT_DIR, "config.json")
+COOKIES_PATH = os.path.join(SCRIPT_DIR, "cookies.txt")
+DEFAULT_DOWNLOAD_PATH = r"C:\Users\chenw\Videos"
+
+
+class WatchedFile:
+    """按修改时间缓存的文件解析结果（线程安全）"""
+
+    def __init__(self, path: str, parse: Callable[[str], Any], default: Any = None):
+        """
+        Args:
+            path: 文件路径
+            parse: 解析函数，参数为文件路径
+            default: 文件不存在或解析失败时的返回值
+        """
+        self.path = path
+        self.parse = parse
+        self.default = default
+        self._signature = None
+        self._value = default
+        self._lock = threading.Lock()
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self) -> Any:
+        """返回解析结果，文件变化后自动重新解析"""
+        signature = self._stat_signature()
+        with self._lock:
+            if signature != self._signature:
+                self._value = self.default
+                if signature is not None:
+                    try:
+                        self._value = self.parse(self.path)
+                    except Exception as e:
+                        print(f"读取 {os.path.basename(self.path)} 失败: {e}")
+                self._signature = signature
+            return self._value
+
+
+def _parse_config(path: str) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _new_cookie_jar(path: Optional[str] = None) -> 'CookieJar':
+    # yt-dlp 的 cookie jar 兼容 #HttpOnly_ 行和 expires=0 的会话 cookie，并提供 yt-dlp 需要的接口
+    from yt_dlp.cookies import YoutubeDLCookieJar
+    return YoutubeDLCookieJar(path)
+
+
+def parse_cookies_file(path: str) -> 'CookieJar':
+    """解析 Netscape 格式的 cookies 文件，保留域名、路径和过期时间"""
+    jar = _new_cookie_jar(path)
+    jar.load(ignore_discard=True, ignore_expires=True)
+    return jar
+
+
+_config_file = WatchedFile(CONFIG_PATH, _parse_config, default={})
+_config_overrides: Dict[str, Any] = {}
+# (config.json的解析结果, 叠加覆盖项后的配置)：文件和覆盖项都不变时返回同一个对象
+_merged_config = (None, None)
+_config_overrides_lock = threading.Lock()
+_cookie_files: Dict[str, WatchedFile] = {}
+_empty_cookie_jar = None
+_cookie_files_lock = threading.Lock()
+
+
+def load_config() -> Dict:
+    """
+    读取config.json配置（只读，不要修改返回的字典）
+    配置不变时返回同一个对象，调用方可以据此判断配置是否修改过
+    """
+    global _merged_config
+    config = _config_file.get()
+    with _config_overrides_lock:
+        if not _config_overrides:
+            return config
+        if _merged_config[0] is not config:
+            _merged_config = (config, {**config, **_config_overrides})
+        return _merged_config[1]
+
+
+@contextmanager
+def override_config(**values) -> Iterator[None]:
+    """
+    在代码块内用给定的值覆盖config.json中的同名配置（进程内全局生效，如基准测试使用临时的 cache_dir）
+    按配置创建的共享对象（缓存、下载存档等）在创建时读取配置，代码块结束后不会随之改变
+    """
+    global _merged_config
+    with _config_overrides_lock:
+        previous = dict(_config_overrides)
+        _config_overrides.update(values)
+        _merged_config = (None, None)
+    try:
+        yield
+    finally:
+        with _config_overrides_lock:
+            _config_overrides.clear()
+            _config_overrides.update(previous)
+            _merged_config = (None, None)
+
+
+def get_download_path() -> str:
+    """从config.json获取下载路径"""
+    return load_config().get('download_path', DEFAULT_DOWNLOAD_PATH)
+
+
+def get_cache_dir() -> str:
+    """缓存目录，默认为项目目录下的 .cache，可在config.json中用 cache_dir 指定"""
+    return load_config().get('cache_dir') or os.path.join(SCRIPT_DIR, ".cache")
+
+
+def get_cookies_path() -> str:
+    """cookies文件路径（项目目录下的 cookies.txt）"""
+    return COOKIES_PATH
+
+
+def get_empty_cookie_jar() -> 'CookieJar':
+    """不使用cookies文件时共用的空 cookie jar"""
+    global _empty_cookie_jar
+    with _cookie_files_lock:
+        if _empty_cookie_jar is None:
+            _empty_cookie_jar = _new_cookie_jar()
+        return _empty_cookie_jar
+
+
+def load_cookies(cookies_path: Optional[str] = None) -> 'CookieJar':
+    """
+    获取cookies文件对应的共享 cookie jar（已清除过期的cookie）
+    文件不变时每次返回同一个对象；文件不存在时返回空的 jar
+    """
+    cookies_path = os.path.abspath(cookies_path or COOKIES_PATH)
+    with _cookie_files_lock:
+        watched = _cookie_files.get(cookies_path)
+        if watched is None:
+            watched = _cookie_files[cookies_path] = WatchedFile(cookies_path, parse_cookies_file)
+    jar = watched.get()
+    if jar is None:
+        return get_empty_cookie_jar()
+    jar.clear_expired_cookies()
+    return jar
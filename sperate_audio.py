@@ -1,12 +1,17 @@
+import argparse
+import fnmatch
 import os
 import subprocess
 import sys
-import shutil
-import tempfile
 import uuid 
 import time
-import tkinter as tk
-from tkinter import filedialog
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Iterable, Iterator, Optional, Sequence
+
+from extraction_manifest import file_signature, get_extraction_manifest
+from metrics import ACTIVE_TASKS, AUDIO_EXTRACTIONS, QUEUE_DEPTH, STAGE_DURATION
 
 
 def is_video_file(file_path):
@@ -30,6 +35,10 @@ def is_video_file(file_path):
 
 def select_folder_with_tkinter():
     """使用tkinter选择文件夹，支持高DPI"""
+    # 只有图形界面选择文件夹时才需要tkinter，不在模块导入时加载（Web界面也导入本模块）
+    import tkinter as tk
+    from tkinter import filedialog
+    
     # 创建根窗口
     root = tk.Tk()
     root.withdraw()  # 隐藏主窗口
@@ -51,56 +60,221 @@ def select_folder_with_tkinter():
     return folder_path
 
 
+def _match_any(patterns, name, relative_path):
+    """通配符中含有 / 时匹配相对于根目录的路径，否则只匹配文件名"""
+    for pattern in patterns:
+        if fnmatch.fnmatch(relative_path if "/" in pattern else name, pattern):
+            return True
+    return False
+
+
+def iter_video_files(
+    roots: Iterable[str],
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    max_depth: Optional[int] = None,
+    follow_symlinks: bool = False,
+) -> Iterator[str]:
+    """
+    用 os.scandir 逐层遍历目录，边遍历边产出视频文件路径（不预先收集和排序）
+
+    Args:
+        roots: 根目录（也可以直接是视频文件）
+        include: 只产出匹配这些通配符的文件，默认为所有视频文件（见 is_video_file）
+        exclude: 跳过匹配这些通配符的文件和目录（匹配的目录整个不进入）
+        max_depth: 最大递归深度，0 表示只扫描根目录本身，None 表示不限制
+        follow_symlinks: 是否进入符号链接指向的目录
+
+    通配符不含 / 时匹配文件名（如 "*.mkv"），含 / 时匹配相对于根目录的路径（如 "2023/*"）
+    """
+    exclude = exclude or ()
+    for root in roots:
+        if os.path.isfile(root):
+            name = os.path.basename(root)
+            if (_match_any(include, name, name) if include else is_video_file(root)) \
+                    and not _match_any(exclude, name, name):
+                yield root
+            continue
+
+        # 深度优先，用栈代替递归；目录中的文件按 scandir 返回的顺序立即产出，不等整个目录读完
+        stack = [(root, "", 0)]
+        while stack:
+            directory, relative_dir, depth = stack.pop()
+            subdirectories = []
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        relative_path = f"{relative_dir}{entry.name}"
+                        if _match_any(exclude, entry.name, relative_path):
+                            continue
+                        try:
+                            if entry.is_dir(follow_symlinks=follow_symlinks):
+                                if max_depth is None or depth < max_depth:
+                                    subdirectories.append((entry.path, relative_path + "/", depth + 1))
+                            elif entry.is_file():
+                                matched = _match_any(include, entry.name, relative_path) if include \
+                                    else is_video_file(entry.name)
+                                if matched:
+                                    yield entry.path
+                        except OSError:
+                            continue
+            except OSError as e:
+                print(f"⚠️ 无法读取目录 {directory}: {e}")
+            stack.extend(reversed(subdirectories))
+
+
 def get_video_files(directory):
     """获取目录中的所有视频文件（仅首层）"""
     if not os.path.isdir(directory):
         return []
+    return sorted(iter_video_files([directory], max_depth=0))  # 排序以便更好的显示
+
+
+# 可以直接复制音频流（不重新编码）的编码及其对应的输出格式
+COPYABLE_AUDIO_CODECS = {
+    "aac": "m4a",
+    "alac": "m4a",
+    "mp3": "mp3",
+    "opus": "opus",
+    "vorbis": "ogg",
+    "flac": "flac",
+}
+
+# 界面显示名称与格式选项的对应关系
+AUDIO_FORMAT_CHOICES = {
+    "AAC": "1",
+    "FLAC": "2",
+    "自动": "3",
+}
+
+
+def probe_audio_codec(video_path):
+    """使用ffprobe获取第一条音频流的编码名称，失败时返回None"""
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe",
+                "-v", "error",
+                "-select_streams", "a:0",
+                "-show_entries", "stream=codec_name",
+                "-of", "default=noprint_wrappers=1:nokey=1",
+                video_path,
+            ],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=30,
+        )
+        codec = result.stdout.strip().splitlines()
+        if result.returncode == 0 and codec:
+            return codec[0].lower()
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+    return None
+
+
+def probe_duration(media_path):
+    """使用ffprobe获取文件时长（秒），失败时返回None"""
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe",
+                "-v", "error",
+                "-show_entries", "format=duration",
+                "-of", "default=noprint_wrappers=1:nokey=1",
+                media_path,
+            ],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=30,
+        )
+        if result.returncode == 0:
+            return float(result.stdout.strip().splitlines()[0])
+    except (OSError, subprocess.TimeoutExpired, ValueError, IndexError):
+        pass
+    return None
 
-    video_files = []
-    # 只扫描第一层级
-    for item in os.listdir(directory):
-        item_path = os.path.join(directory, item)
-        if os.path.isfile(item_path) and is_video_file(item_path):
-            video_files.append(item_path)
 
-    return sorted(video_files)  # 排序以便更好的显示
+def get_audio_plan(video_path, format_choice):
+    """
+    根据格式选项和源音频编码确定输出方式，能直接复制音频流时不重新编码
+
+    Returns:
+        (输出扩展名, ffmpeg音频参数, 格式名称)
+    """
+    codec = probe_audio_codec(video_path)
+
+    if format_choice == "1":
+        # 高品质AAC
+        if codec == "aac":
+            return "aac", ["-c:a", "copy"], "AAC音频(直接复制)"
+        return "aac", ["-c:a", "aac", "-b:a", "320k"], "AAC音频"
+    elif format_choice == "2":
+        # 无损FLAC
+        if codec == "flac":
+            return "flac", ["-c:a", "copy"], "FLAC音频(直接复制)"
+        return "flac", ["-c:a", "flac"], "FLAC音频"
+    else:
+        # 自动：源编码可直接封装时复制音频流，否则编码为AAC
+        if codec in COPYABLE_AUDIO_CODECS:
+            output_format = COPYABLE_AUDIO_CODECS[codec]
+            return output_format, ["-c:a", "copy"], f"{codec.upper()}音频(直接复制)"
+        return "m4a", ["-c:a", "aac", "-b:a", "320k"], "AAC音频"
+
+
+_extraction_slots = None
+_extraction_slots_lock = threading.Lock()
+
+
+def get_extraction_slots() -> threading.BoundedSemaphore:
+    """
+    进程内共享的ffmpeg进程名额（CPU核心数）
+    多个提取阶段（如Web界面同时运行的多个任务）合计不超过该数量，避免CPU超额占用
+    """
+    global _extraction_slots
+    with _extraction_slots_lock:
+        if _extraction_slots is None:
+            _extraction_slots = threading.BoundedSemaphore(os.cpu_count() or 1)
+        return _extraction_slots
 
 
 def convert_to_audio(video_path, format_choice, keep_original):
-    """转换视频为音频"""
+    """
+    转换视频为音频；没有空闲的ffmpeg名额时等待
+
+    Returns:
+        成功时返回输出音频文件路径，失败时返回None
+    """
+    with get_extraction_slots(), ACTIVE_TASKS.track(stage='audio_extract'), \
+            STAGE_DURATION.time(stage='audio_extract'):
+        output = _convert_to_audio(video_path, format_choice, keep_original)
+    AUDIO_EXTRACTIONS.inc(result='success' if output else 'failed')
+    return output
+
+
+def _convert_to_audio(video_path, format_choice, keep_original):
     # 获取视频文件目录和文件名（不带扩展名）
     directory, filename = os.path.split(video_path)
     filename_without_ext = os.path.splitext(filename)[0]
 
     # 确定输出格式和ffmpeg参数
-    if format_choice == "1":
-        # 高品质AAC
-        output_format = "aac"
-        format_params = ["-c:a", "aac", "-b:a", "320k"]
-        format_name = "AAC音频"
-    else:
-        # 无损FLAC
-        output_format = "flac"
-        format_params = ["-c:a", "flac"]
-        format_name = "FLAC音频"
-
-    # 创建临时文件用于处理
-    temp_dir = tempfile.gettempdir()
-    temp_input = os.path.join(temp_dir, f"input_{uuid.uuid4().hex}.mp4")
-    temp_output = os.path.join(temp_dir, f"output_{uuid.uuid4().hex}.{output_format}")
+    output_format, format_params, format_name = get_audio_plan(video_path, format_choice)
+
+    # 输出到同目录下的临时文件，完成后原子替换为最终文件
     final_output = os.path.join(directory, f"{filename_without_ext}.{output_format}")
+    temp_output = os.path.join(directory, f".{filename_without_ext}.{uuid.uuid4().hex}.{output_format}")
 
     try:
-        # 复制源文件到临时文件
-        print(f"\n正在准备处理 {filename}...")
-        shutil.copy2(video_path, temp_input)
-
-        # 构建FFmpeg命令
-        print(f"正在将 {filename} 转换为{format_name}...")
+        # 构建FFmpeg命令，直接读取源视频
+        print(f"\n正在将 {filename} 转换为{format_name}...")
         ffmpeg_cmd = [
             "ffmpeg",
+            "-nostdin",
             "-i",
-            temp_input,
+            video_path,
             "-vn",  # 不要视频流
         ]
         ffmpeg_cmd.extend(format_params)
@@ -115,9 +289,11 @@ def convert_to_audio(video_path, format_choice, keep_original):
             encoding="utf-8",
             errors="replace",
             timeout=300,  # 5分钟超时
-        )        # 检查转换结果
-        if result.returncode == 0 and os.path.exists(temp_output):            # 复制临时输出文件到最终位置
-            shutil.copy2(temp_output, final_output)
+        )
+        # 检查转换结果
+        if result.returncode == 0 and os.path.exists(temp_output):
+            # 原子替换到最终位置
+            os.replace(temp_output, final_output)
             print(f"✅ 转换完成: {os.path.basename(final_output)}")
 
             # 如果用户选择不保留原视频
@@ -125,31 +301,230 @@ def convert_to_audio(video_path, format_choice, keep_original):
                 os.remove(video_path)
                 print(f"🗑️ 已删除原视频文件: {os.path.basename(video_path)}")
             
-            return True
+            return final_output
         else:
             print(f"❌ 转换失败: {filename}")
             if result.stdout:
                 print(f"FFmpeg输出: {result.stdout}")
-            return False
+            return None
             
     except subprocess.TimeoutExpired:
         print(f"⏰ 转换超时: 处理 {filename} 时间过长，已中止")
-        return False
+        return None
     except Exception as e:
         print(f"❌ 转换过程中出错: {e}")
-        return False
+        return None
     finally:
-        # 清理临时文件
-        for temp_file in [temp_input, temp_output]:
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except:  # noqa: E722
-                    pass
+        # 清理未完成的临时文件
+        if os.path.exists(temp_output):
+            try:
+                os.remove(temp_output)
+            except:  # noqa: E722
+                pass
+
+
+# 输出格式或ffmpeg参数变化时递增，使提取清单中的旧记录失效
+AUDIO_PLAN_VERSION = 1
+# 输出扩展名固定的格式选项（自动格式的扩展名取决于源音频编码）
+FIXED_OUTPUT_FORMATS = {"1": "aac", "2": "flac"}
+# 补记清单中没有记录的输出文件时，允许与源视频相差的时长（秒）
+DURATION_TOLERANCE = 1.0
+
+
+def encode_settings(format_choice):
+    """提取清单中区分编码设置的字符串"""
+    return f"v{AUDIO_PLAN_VERSION} format={format_choice}"
 
 
-def main():
-    """简化的主函数，使用图形界面选择文件夹"""
+def find_up_to_date_output(video_path, format_choice, manifest, signature=None):
+    """
+    查找源视频在该格式下仍然有效的音频输出，需要重新提取时返回None
+
+    先查提取清单；清单中没有记录时（如启用清单之前提取的文件），固定格式的输出文件
+    比源视频新、且时长与源视频一致时视为有效，并补记到清单中
+    """
+    signature = signature or file_signature(video_path)
+    if signature is None:
+        return None
+    settings = encode_settings(format_choice)
+    output = manifest.lookup(video_path, settings, signature)
+    if output:
+        return output
+
+    extension = FIXED_OUTPUT_FORMATS.get(format_choice)
+    if extension:
+        candidate = f"{os.path.splitext(video_path)[0]}.{extension}"
+        candidate_signature = file_signature(candidate)
+        # 早期版本直接写入最终文件名，中断后可能留下不完整的输出，需比较时长确认完整
+        if candidate_signature and candidate_signature[0] > 0 and candidate_signature[1] >= signature[1] \
+                and _same_duration(candidate, video_path):
+            manifest.record(video_path, settings, candidate, signature)
+            return candidate
+    return None
+
+
+def _same_duration(output_path, video_path):
+    """输出音频与源视频的时长是否一致（允许1秒或2%的误差；裸AAC的时长由码率估算）；无法读取时长时视为不一致"""
+    output_duration = probe_duration(output_path)
+    source_duration = probe_duration(video_path)
+    if output_duration is None or source_duration is None:
+        return False
+    return abs(output_duration - source_duration) <= max(DURATION_TOLERANCE, source_duration * 0.02)
+
+
+def convert_if_needed(video_path, format_choice, keep_original, manifest=None, skip_unchanged=True):
+    """
+    转换视频为音频；提供提取清单时跳过已是最新的视频，并在转换成功后写入清单
+    跳过的视频不会被删除（即使 keep_original 为 "2"）
+
+    Args:
+        skip_unchanged: 为False时不查询清单、总是重新提取，成功后仍写入清单
+
+    Returns:
+        (输出音频路径或None, 是否因已是最新而跳过)
+    """
+    if manifest is None:
+        return convert_to_audio(video_path, format_choice, keep_original), False
+
+    # 转换后可能删除源视频，签名需在转换前读取
+    signature = file_signature(video_path)
+    output = skip_unchanged and find_up_to_date_output(video_path, format_choice, manifest, signature)
+    if output:
+        print(f"⏭️ 音频已是最新，跳过: {os.path.basename(video_path)}")
+        AUDIO_EXTRACTIONS.inc(result='skipped')
+        return output, True
+
+    output = convert_to_audio(video_path, format_choice, keep_original)
+    if output and signature:
+        manifest.record(video_path, encode_settings(format_choice), output, signature)
+    return output, False
+
+
+def convert_batch(video_paths, format_choice, keep_original, workers=None, skip_unchanged=True):
+    """
+    并行转换多个视频，按完成顺序逐个产出结果
+
+    每个任务都是独立的ffmpeg进程，线程只负责启动并等待进程结束
+
+    Args:
+        video_paths: 视频文件路径（可以是生成器，按需读取）
+        format_choice: 输出格式选项，见 AUDIO_FORMAT_CHOICES
+        keep_original: "1"保留原视频，"2"删除
+        workers: 同时运行的ffmpeg进程数，默认为CPU核心数（仍受进程内共享的名额限制，见 get_extraction_slots）
+        skip_unchanged: 根据提取清单跳过上次提取后没有变化的视频；为False时全部重新提取，
+                        成功后仍写入清单
+
+    Yields:
+        {'video_path': 源视频路径, 'output': 输出音频路径或None, 'success': 是否成功,
+         'skipped': 是否因已是最新而跳过}
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    manifest = get_extraction_manifest()
+
+    def to_result(future, video_path):
+        try:
+            output = future.result()
+        except Exception as e:
+            print(f"❌ 转换过程中出错: {e}")
+            output = None
+        signature = signatures.pop(video_path, None)
+        if output and signature:
+            manifest.record(video_path, encode_settings(format_choice), output, signature)
+        return {'video_path': video_path, 'output': output, 'success': bool(output), 'skipped': False}
+
+    signatures = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = {}
+        for video_path in video_paths:
+            # 转换后可能删除源视频，签名需在转换前读取；已是最新的视频不占用转换线程，直接产出结果
+            signature = file_signature(video_path)
+            output = skip_unchanged and find_up_to_date_output(video_path, format_choice, manifest, signature)
+            if output:
+                AUDIO_EXTRACTIONS.inc(result='skipped')
+                yield {'video_path': video_path, 'output': output, 'success': True, 'skipped': True}
+                continue
+            signatures[video_path] = signature
+            # 保持最多workers个任务在运行，避免一次性提交整个列表
+            if len(in_flight) >= workers:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield to_result(future, in_flight.pop(future))
+            future = executor.submit(convert_to_audio, video_path, format_choice, keep_original)
+            in_flight[future] = video_path
+
+        for future in as_completed(in_flight):
+            yield to_result(future, in_flight[future])
+
+
+class ExtractionStage:
+    """
+    流水线中的音频提取阶段：有界队列 + 固定数量的提取线程
+
+    上游（如下载）每完成一个视频就调用 submit 交给提取线程；队列满时 submit 阻塞，
+    从而限制积压的视频数量。每个文件处理完后通过 on_result 回调结果。
+    同时运行的ffmpeg进程数由所有提取阶段共享的名额限制（见 get_extraction_slots）。
+    """
+
+    def __init__(self, format_choice, keep_original, workers=None, queue_size=None, on_result=None,
+                 skip_unchanged=True):
+        self.format_choice = format_choice
+        self.keep_original = keep_original
+        # 根据提取清单跳过上次提取后没有变化的视频；强制重新提取时仍把结果写入清单
+        self.manifest = get_extraction_manifest()
+        self.skip_unchanged = skip_unchanged
+        self.on_result = on_result
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.results = []
+        self._queue = queue.Queue(maxsize=queue_size or self.workers * 2)
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"audio-extract-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _worker(self):
+        while True:
+            video_path = self._queue.get()
+            if video_path is None:
+                break
+            QUEUE_DEPTH.dec(queue='audio_extract')
+            try:
+                output, skipped = convert_if_needed(
+                    video_path, self.format_choice, self.keep_original, self.manifest, self.skip_unchanged
+                )
+            except Exception as e:
+                print(f"❌ 转换过程中出错: {e}")
+                output, skipped = None, False
+            result = {'video_path': video_path, 'output': output, 'success': bool(output), 'skipped': skipped}
+            with self._lock:
+                self.results.append(result)
+            if self.on_result:
+                self.on_result(result)
+
+    def submit(self, video_path):
+        """提交一个待提取的视频，队列满时阻塞"""
+        QUEUE_DEPTH.inc(queue='audio_extract')
+        self._queue.put(video_path)
+
+    def close(self):
+        """不再接收新任务，等待已提交的任务全部完成并返回所有结果"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        return self.results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def interactive_main():
+    """交互模式：使用图形界面选择文件夹，在终端中选择视频和格式"""
     print("🎬" + "=" * 48)
     print("   视频音频分离工具")  
     print("=" * 50)
@@ -205,25 +580,27 @@ def main():
     print("\n🎵 请选择输出音频格式:")
     print("  1. AAC (高品质，小文件)")
     print("  2. FLAC (无损，大文件)")
-    format_choice = input("请选择 [1/2] (默认AAC): ").strip() or "1"
+    print("  3. 自动 (源音频可直接封装时不重新编码，最快)")
+    format_choice = input("请选择 [1/2/3] (默认AAC): ").strip() or "1"
     
-    while format_choice not in ["1", "2"]:
-        format_choice = input("❌ 无效选项，请重新选择 [1/2]: ").strip()
+    while format_choice not in AUDIO_FORMAT_CHOICES.values():
+        format_choice = input("❌ 无效选项，请重新选择 [1/2/3]: ").strip()
     
-    format_name = "AAC" if format_choice == "1" else "FLAC"
+    format_name = {choice: name for name, choice in AUDIO_FORMAT_CHOICES.items()}[format_choice]
     print(f"📤 选择格式: {format_name}")
     
-    # 开始转换
-    print(f"\n🚀 开始转换...")
+    # 开始转换（多个ffmpeg进程并行）
+    workers = min(os.cpu_count() or 1, len(selected_videos))
+    print(f"\n🚀 开始转换（并行 {workers} 个任务）...")
     start_time = time.time()
     total = len(selected_videos)
     successful = 0
     
-    for i, video_path in enumerate(selected_videos, 1):
-        print(f"\n[{i}/{total}] 处理: {os.path.basename(video_path)}")
-        
-        # 转换视频（默认保留原文件）
-        if convert_to_audio(video_path, format_choice, "1"):
+    # 转换视频（默认保留原文件）
+    for i, result in enumerate(convert_batch(selected_videos, format_choice, "1", workers), 1):
+        status = "⏭️" if result['skipped'] else ("✅" if result['success'] else "❌")
+        print(f"[{i}/{total}] {status} {os.path.basename(result['video_path'])}")
+        if result['success']:
             successful += 1
     
     # 转换完成报告
@@ -234,7 +611,91 @@ def main():
     
     if successful > 0:
         print(f"📁 音频文件保存在: {target_folder}")
-    
-    
+
+
+# 命令行格式名称与格式选项的对应关系
+CLI_FORMAT_CHOICES = {
+    "aac": "1",
+    "flac": "2",
+    "auto": "3",
+}
+
+
+def extract_audio_batch(roots, format_choice="1", keep_original="1", include=None, exclude=None,
+                        max_depth=None, workers=None, skip_unchanged=True):
+    """
+    非交互的批量提取：边遍历目录边转换，不等待整个目录树扫描完成
+
+    Args:
+        roots: 根目录或视频文件列表
+        format_choice: 输出格式选项，见 AUDIO_FORMAT_CHOICES
+        keep_original: "1"保留原视频，"2"删除
+        include / exclude / max_depth: 见 iter_video_files
+        workers: 同时运行的ffmpeg进程数，默认为CPU核心数（仍受进程内共享的名额限制，见 get_extraction_slots）
+        skip_unchanged: 根据提取清单跳过上次提取后没有变化的视频；为False时全部重新提取，
+                        成功后仍写入清单
+
+    Yields:
+        每个视频的转换结果，见 convert_batch
+    """
+    video_files = iter_video_files(roots, include=include, exclude=exclude, max_depth=max_depth)
+    yield from convert_batch(video_files, format_choice, keep_original, workers, skip_unchanged)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="视频音频分离工具。不指定目录时打开图形界面选择文件夹（交互模式）",
+    )
+    parser.add_argument("roots", nargs="*", help="要处理的目录或视频文件（可指定多个）")
+    parser.add_argument("--include", action="append", metavar="GLOB",
+                        help="只处理匹配的文件，可重复指定（默认：所有视频文件）")
+    parser.add_argument("--exclude", action="append", metavar="GLOB",
+                        help="跳过匹配的文件或目录，可重复指定；含 / 时匹配相对路径")
+    parser.add_argument("--max-depth", type=int, metavar="N",
+                        help="最大递归深度，0 表示只处理根目录本身（默认不限制）")
+    parser.add_argument("--format", choices=list(CLI_FORMAT_CHOICES), default="aac",
+                        help="输出格式：aac 高品质，flac 无损，auto 可直接封装时不重新编码（默认aac）")
+    parser.add_argument("--delete-original", action="store_true", help="转换成功后删除原视频")
+    parser.add_argument("--workers", type=int, help="同时运行的ffmpeg进程数（默认CPU核心数）")
+    parser.add_argument("--force", action="store_true", help="不查询提取清单，重新提取所有视频（结果仍写入清单）")
+    parser.add_argument("--list", action="store_true", help="只列出将要处理的文件，不转换")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """命令行入口：指定目录时以非交互方式批量处理，返回进程退出码"""
+    args = parse_args(argv)
+    if not args.roots:
+        interactive_main()
+        return 0
+
+    if args.list:
+        count = 0
+        for path in iter_video_files(args.roots, args.include, args.exclude, args.max_depth):
+            print(path)
+            count += 1
+        print(f"共 {count} 个文件", file=sys.stderr)
+        return 0
+
+    start_time = time.time()
+    total = successful = skipped = 0
+    keep_original = "2" if args.delete_original else "1"
+    for result in extract_audio_batch(args.roots, CLI_FORMAT_CHOICES[args.format], keep_original,
+                                      args.include, args.exclude, args.max_depth, args.workers,
+                                      skip_unchanged=not args.force):
+        total += 1
+        status = "⏭️" if result['skipped'] else ("✅" if result['success'] else "❌")
+        print(f"[{total}] {status} {result['video_path']}")
+        if result['skipped']:
+            skipped += 1
+        elif result['success']:
+            successful += 1
+
+    print(f"\n⏱️  总用时: {time.time() - start_time:.1f}秒")
+    print(f"📊 处理结果: 共 {total} 个文件，成功 {successful} 个，已是最新 {skipped} 个，"
+          f"失败 {total - successful - skipped} 个")
+    return 0 if successful + skipped == total else 1
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
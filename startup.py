@@ -0,0 +1,49 @@
+"""
+启动耗时统计
+记录Web界面启动过程中各阶段（导入gradio、构建界面、端口就绪、后台预加载等）的耗时，
+用于确认端口尽快开始服务；需要更细的模块级明细时使用 python -X importtime web_interface.py
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+
+class StartupTimer:
+    """按阶段记录耗时，起点为创建时刻（即本模块首次被导入时）"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """记录代码块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages.append((name, time.perf_counter() - start))
+
+    def mark(self, name: str):
+        """记录从启动到当前时刻的总耗时（如端口就绪）"""
+        with self._lock:
+            self.stages.append((name, self.elapsed()))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def report(self) -> str:
+        """文本形式的耗时明细"""
+        with self._lock:
+            stages = list(self.stages)
+        width = max((len(name) for name, _ in stages), default=0)
+        lines = ["⏱️ 启动耗时:"]
+        lines.extend(f"   {name:<{width}}  {seconds * 1000:8.1f} ms" for name, seconds in stages)
+        return "\n".join(lines)
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,177 @@
+"""
+高速传输模式（turbo）
+按站点配置的多连接传输参数：
+- HLS/DASH 等分片格式：多个分片并发下载（yt-dlp 的 concurrent_fragment_downloads）
+- 渐进式文件（单个MP4等）：拆分为多个 Range 请求并行下载，按顺序拼接
+- 每个分片单独重试，失败不会导致整个文件重新下载
+
+config.json 示例:
+    "transfer_mode": "turbo",
+    "turbo_profiles": {
+        "default": {"concurrent_fragments": 8},
+        "bilibili.com": {"concurrent_fragments": 4},
+        "example.com": null            # 该站点不使用高速模式
+    }
+"""
+
+import shutil
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from yt_dlp.downloader import PROTOCOL_MAP
+from yt_dlp.downloader.fragment import FragmentFD
+from yt_dlp.networking import Request
+from yt_dlp.postprocessor.common import PostProcessor
+
+from settings import load_config
+
+
+TRANSFER_MODES = ('normal', 'turbo')
+DEFAULT_TRANSFER_MODE = 'normal'
+
+DEFAULT_TURBO_PROFILE = {
+    # 同时下载的分片数（HLS/DASH 分片，或渐进式文件的 Range 分段）
+    'concurrent_fragments': 8,
+    # 单个分片的重试次数
+    'fragment_retries': 10,
+    # 渐进式文件拆分的分段大小；分段先写入临时文件再按顺序拼接
+    'range_chunk_size': 8 * 1024 * 1024,
+    # 小于该大小的渐进式文件不拆分
+    'min_range_size': 16 * 1024 * 1024,
+    # 渐进式文件改用外部下载器（目前支持 'aria2c'），未安装时使用内置的 Range 分段下载
+    'external_downloader': None,
+}
+# 内置的站点配置，可在 config.json 的 turbo_profiles 中覆盖
+DEFAULT_SITE_PROFILES = {
+    # B站对单个IP的连接数比较敏感，而调度器已允许同一站点同时下载多个视频
+    'bilibili.com': {'concurrent_fragments': 4},
+}
+
+# 由 RangeSplitPP 改写后的格式使用的协议名，对应下面的 RangeSegmentsFD
+RANGE_PROTOCOL = 'http_ranges'
+
+
+def resolve_profile(url: str, mode: Optional[str] = None) -> Optional[Dict]:
+    """
+    获取URL所在站点的高速传输配置
+
+    Args:
+        url: 视频URL
+        mode: 传输模式（normal/turbo），默认读取 config.json 的 transfer_mode
+
+    Returns:
+        合并后的配置字典；普通模式或该站点关闭了高速模式时返回 None
+    """
+    config = load_config()
+    mode = mode or config.get('transfer_mode', DEFAULT_TRANSFER_MODE)
+    if mode not in TRANSFER_MODES:
+        raise ValueError(f"未知的传输模式: {mode}，可选 {', '.join(TRANSFER_MODES)}")
+    if mode != 'turbo':
+        return None
+
+    profiles = {**DEFAULT_SITE_PROFILES, **config.get('turbo_profiles', {})}
+    host = (urlparse(url).hostname or '').lower()
+    site_profile = {}
+    for domain, profile in profiles.items():
+        domain = domain.lower().lstrip('.')
+        if domain != 'default' and (host == domain or host.endswith('.' + domain)):
+            site_profile = profile
+            break
+    if site_profile is None:
+        return None
+    return {**DEFAULT_TURBO_PROFILE, **(profiles.get('default') or {}), **site_profile}
+
+
+def ytdlp_params(profile: Optional[Dict]) -> Dict:
+    """将高速传输配置转换为 yt-dlp 参数，普通模式返回空字典"""
+    if not profile:
+        return {}
+    connections = max(1, int(profile['concurrent_fragments']))
+    params = {
+        'concurrent_fragment_downloads': connections,
+        'fragment_retries': int(profile['fragment_retries']),
+    }
+    if profile.get('external_downloader') == 'aria2c' and shutil.which('aria2c'):
+        params['external_downloader'] = {'http': 'aria2c'}
+        params['external_downloader_args'] = {
+            'aria2c': ['-x', str(connections), '-s', str(connections), '-k', '1M'],
+        }
+    elif connections > 1:
+        params['range_split'] = {
+            'chunk_size': max(1024 * 1024, int(profile['range_chunk_size'])),
+            'min_size': int(profile['min_range_size']),
+        }
+    return params
+
+
+class RangeSegmentsFD(FragmentFD):
+    """
+    把渐进式文件按 byte_range 分段下载：分段的并发、重试、续传（.ytdl 记录）和进度报告
+    都复用 yt-dlp 的分片下载逻辑
+    """
+
+    FD_NAME = 'ranges'
+
+    def real_download(self, filename, info_dict):
+        ranges = info_dict['fragments']
+        ctx = {
+            'filename': filename,
+            'total_frags': len(ranges),
+        }
+        self._prepare_and_start_frag_download(ctx, info_dict)
+
+        fragments = [
+            {'frag_index': index, 'index': index - 1, 'url': fragment['url'], 'byte_range': fragment['byte_range']}
+            for index, fragment in enumerate(ranges, 1) if index > ctx['fragment_index']
+        ]
+        # 缺少任何一段文件都不完整，所有分段都是必需的
+        return self.download_and_append_fragments(ctx, fragments, info_dict, is_fatal=lambda index: True)
+
+
+class RangeSplitPP(PostProcessor):
+    """
+    下载前（before_dl）把选中的渐进式 HTTP 格式改写为 Range 分段下载；
+    只有启用了 range_split 参数且服务器支持 Range 请求时才改写
+    """
+
+    def run(self, info):
+        options = self._downloader.params.get('range_split')
+        if options:
+            for fmt in info.get('requested_formats') or [info]:
+                self._split(fmt, options)
+        return [], info
+
+    def _split(self, fmt: Dict, options: Dict):
+        if fmt.get('protocol') not in ('http', 'https') or fmt.get('is_live') or not fmt.get('url'):
+            return
+        size = self._probe_size(fmt)
+        if not size or size < options['min_size']:
+            return
+        chunk_size = options['chunk_size']
+        fmt['fragments'] = [
+            {'url': fmt['url'], 'byte_range': {'start': start, 'end': min(start + chunk_size, size)}}
+            for start in range(0, size, chunk_size)
+        ]
+        fmt['filesize'] = size
+        fmt['protocol'] = RANGE_PROTOCOL
+        self.write_debug(f"{fmt.get('format_id')}: 拆分为 {len(fmt['fragments'])} 个 Range 分段")
+
+    def _probe_size(self, fmt: Dict) -> Optional[int]:
+        """请求第一个字节，服务器返回 206 和 Content-Range 时得到文件总大小"""
+        headers = {**(fmt.get('http_headers') or {}), 'Range': 'bytes=0-0'}
+        try:
+            response = self._downloader.urlopen(Request(fmt['url'], headers=headers))
+        except Exception as e:
+            self.write_debug(f"Range 探测失败，按普通方式下载: {e}")
+            return None
+        try:
+            content_range = response.headers.get('Content-Range') or ''
+            if response.status != 206 or '/' not in content_range:
+                return None
+            total = content_range.rsplit('/', 1)[1]
+            return int(total) if total.isdigit() else None
+        finally:
+            response.close()
+
+
+PROTOCOL_MAP.setdefault(RANGE_PROTOCOL, RangeSegmentsFD)
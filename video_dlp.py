@@ -1,75 +1,104 @@
-import subprocess
+import argparse
 import os
-import json
 import sys
+import time
 from datetime import datetime
+from yt_dlp.utils import DownloadError
+from download_engine import get_engine, DEFAULT_PAGE_SIZE
+from download_scheduler import get_download_scheduler
+from metadata_cache import get_metadata_cache
+from progress import ProgressEvent
+from download_archive import entry_archive_id, get_download_archive
+from metrics import ACTIVE_TASKS, DOWNLOADED_BYTES, DOWNLOADS, PLAYLIST_ENTRIES, QUEUE_DEPTH, STAGE_DURATION
+from settings import load_config, get_download_path, get_cookies_path
+from turbo import resolve_profile
 from video_title_fetcher import enhance_video_titles
 
 def get_python_executable():
     """获取当前Python解释器的完整路径"""
     return sys.executable
 
-def get_download_path():
-    """从config.json获取下载路径"""
-    try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        config_path = os.path.join(script_dir, "config.json")
-        
-        if os.path.exists(config_path):
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                return config.get('download_path', r"C:\Users\chenw\Videos")
-        else:
-            return r"C:\Users\chenw\Videos"
-    except Exception as e:
-        print(f"读取配置文件失败: {e}")
-        return r"C:\Users\chenw\Videos"
+# 合集条目中需要保留（并写入缓存）的字段
+PLAYLIST_ENTRY_FIELDS = (
+    'id', 'title', 'url', 'webpage_url', 'ie_key', 'duration', 'playlist_title', 'playlist_index'
+)
 
-def check_playlist(url):
-    """检查URL是否为视频合集"""
+def iter_playlist(url, cookies_path=None, use_cache=True, max_entries=None, page_size=None):
+    """
+    流式检查URL是否为视频合集：每获取一页条目就产出一次 (is_playlist, 截至目前的全部条目)，
+    最后一次产出即为完整结果；只有完整枚举的结果才写入缓存
+    
+    Args:
+        url: 视频或合集URL
+        cookies_path: cookies文件路径
+        use_cache: 是否使用缓存
+        max_entries: 最多获取的条目数，默认读取config.json的 playlist_max_entries（不限制）
+        page_size: 每页条目数，默认读取config.json的 playlist_page_size
+    """
+    cache = get_metadata_cache()
+    if use_cache:
+        cached = cache.get('playlist', url)
+        if cached is not None:
+            print(f"使用缓存的合集信息（{len(cached['entries'])} 条）")
+            yield cached['is_playlist'], cached['entries']
+            return
+    
+    config = load_config()
+    max_entries = max_entries or config.get('playlist_max_entries')
+    page_size = page_size or config.get('playlist_page_size', DEFAULT_PAGE_SIZE)
+    
+    entries = []
+    started = time.perf_counter()
     try:
         print("正在检查是否为视频合集...")
-        python_exe = get_python_executable()
-        result = subprocess.run(
-            [python_exe, "-m", "yt_dlp", "--flat-playlist", "--dump-json", url], 
-            capture_output=True, 
-            text=True, 
-            check=True,
-            timeout=30  # 添加超时时间
-        )
-        
-        # 解析输出以确定是否为合集
-        output_lines = result.stdout.strip().split('\n')
-        print(f"yt-dlp返回了 {len(output_lines)} 行数据")
-        
-        # 过滤空行
-        output_lines = [line for line in output_lines if line.strip()]
-        print(f"过滤空行后有 {len(output_lines)} 行有效数据")
-        
-        if len(output_lines) > 1:
-            # 有多行JSON输出，说明是合集
-            print("检测到视频合集")
-            return True, output_lines
-        else:
-            # 只有单个视频
-            print("检测到单个视频")
-            return False, []
-    except subprocess.CalledProcessError as e:
-        # 命令执行失败
-        print(f"yt-dlp命令执行失败: {e}")
-        return False, []
-    except subprocess.TimeoutExpired:
-        print("yt-dlp命令执行超时")
-        return False, []
+        for info, page in get_engine().iter_entries(url, cookies_path, page_size, max_entries):
+            playlist_title = info.get('title', '')
+            for entry in page:
+                entry.setdefault('playlist_title', playlist_title)
+                entry.setdefault('playlist_index', len(entries) + 1)
+                entries.append({field: entry[field] for field in PLAYLIST_ENTRY_FIELDS if field in entry})
+            # 有多个条目，说明是合集，立即产出已获取的部分
+            if len(entries) > 1:
+                print(f"已获取 {len(entries)} 条合集数据...")
+                yield True, list(entries)
+    except DownloadError as e:
+        # 解析失败；已获取到的部分合集仍然保留（不写入缓存）
+        print(f"yt-dlp解析失败: {e}")
+        STAGE_DURATION.observe(time.perf_counter() - started, stage='enumerate')
+        if len(entries) <= 1:
+            yield False, []
+        return
+    
+    STAGE_DURATION.observe(time.perf_counter() - started, stage='enumerate')
+    PLAYLIST_ENTRIES.inc(len(entries))
+    if len(entries) > 1:
+        print(f"检测到视频合集，共 {len(entries)} 个视频")
+        is_playlist = True
+    else:
+        # 只有单个视频
+        print("检测到单个视频")
+        is_playlist, entries = False, []
+        yield is_playlist, entries
+    
+    if max_entries is None or len(entries) < max_entries:
+        cache.set('playlist', url, {'is_playlist': is_playlist, 'entries': entries})
 
-def get_playlist_videos(output_lines):
-    """从yt-dlp输出中解析视频信息（仅解析基础信息，不处理标题）"""
+def check_playlist(url, cookies_path=None, use_cache=True, max_entries=None):
+    """检查URL是否为视频合集，返回 (is_playlist, 全部条目)"""
+    result = (False, [])
+    for result in iter_playlist(url, cookies_path, use_cache, max_entries):
+        pass
+    return result
+
+def get_playlist_videos(entries):
+    """
+    从yt-dlp解析结果中提取视频信息（仅解析基础信息，不处理标题）
+    同时查询下载存档，已下载过的视频标记 downloaded=True
+    """
     videos = []
-    for i, line in enumerate(output_lines):
+    for i, video_info in enumerate(entries):
         try:
-            if line.strip():  # 确保行不为空
-                video_info = json.loads(line)
-                
+            if video_info:  # 确保条目不为空
                 # 只解析基础信息，标题处理交给 video_title_fetcher
                 playlist_title = video_info.get('playlist_title', '')
                 playlist_index = video_info.get('playlist_index', i+1)
@@ -79,12 +108,15 @@ def get_playlist_videos(output_lines):
                     'id': video_info.get('id', ''),
                     'url': video_info.get('webpage_url', '') or video_info.get('url', ''),
                     'playlist_index': playlist_index,
-                    'playlist_title': playlist_title
+                    'playlist_title': playlist_title,
+                    'archive_id': entry_archive_id(video_info)
                 })
-        except json.JSONDecodeError:
-            continue
         except Exception:
             continue
+    
+    downloaded = get_download_archive().downloaded(video['archive_id'] for video in videos)
+    for video in videos:
+        video['downloaded'] = video['archive_id'] in downloaded
     return videos
 
 def sanitize_filename(filename):
@@ -115,7 +147,52 @@ def create_download_folder(use_timestamp=True, base_path=None):
     
     return download_folder
 
-def download_videos(url, videos=None, selected_indices=None, cookies_path=None, use_timestamp=True):
+# 后处理器名称到指标阶段名的映射
+POSTPROCESSOR_STAGES = {
+    'Merger': 'merge',
+    'EmbedThumbnail': 'embed_thumbnail',
+}
+
+def _result_label(result):
+    if result.get('skipped'):
+        return 'skipped'
+    return 'success' if result['success'] else 'failed'
+
+class _TransferTracker:
+    """从单个视频的下载和后处理回调中统计传输字节数和各阶段耗时"""
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.bytes_seen = {}
+        self.postprocessor_started = {}
+    
+    def on_progress(self, status):
+        filename = status.get('filename') or ''
+        downloaded = status.get('downloaded_bytes') or 0
+        if status.get('status') == 'finished':
+            downloaded = downloaded or status.get('total_bytes') or 0
+        # yt-dlp 报告的是累计值，按文件记录上次的值并累加增量
+        delta = downloaded - self.bytes_seen.get(filename, 0)
+        if delta > 0:
+            DOWNLOADED_BYTES.inc(delta)
+            self.bytes_seen[filename] = downloaded
+        if status.get('status') == 'finished':
+            # 单个文件的传输耗时（多个文件时从上一个文件完成算起）
+            now = time.perf_counter()
+            STAGE_DURATION.observe(now - self.started, stage='download')
+            self.started = now
+    
+    def on_postprocessor(self, status):
+        name = status.get('postprocessor')
+        if status.get('status') == 'started':
+            self.postprocessor_started[name] = time.perf_counter()
+        elif status.get('status') == 'finished' and name in self.postprocessor_started:
+            STAGE_DURATION.observe(time.perf_counter() - self.postprocessor_started.pop(name),
+                                   stage=POSTPROCESSOR_STAGES.get(name, 'postprocess'))
+
+def download_videos(url, videos=None, selected_indices=None, cookies_path=None, use_timestamp=True,
+                    max_workers=None, on_result=None, base_path=None, on_progress=None, skip_downloaded=True,
+                    transfer_mode=None):
     """
     下载视频
     
@@ -125,106 +202,139 @@ def download_videos(url, videos=None, selected_indices=None, cookies_path=None,
         selected_indices: 选定的视频索引（用于合集）
         cookies_path: cookies文件路径
         use_timestamp: 是否使用时间戳文件夹（Web界面传False）
+        max_workers: 本次最多同时下载的视频数（仍受全局并发上限限制），默认读取config.json
+        on_result: 每个视频下载结束时的回调，参数为该视频的结果字典
+        base_path: 下载根目录，默认读取config.json
+        on_progress: 进度回调，参数为 progress.ProgressEvent（可能在多个下载线程中调用）
+        skip_downloaded: 是否跳过下载存档中已有的视频（不访问网络）；为False时重新下载
+                         （如文件已被删除或移动），两种情况下载完成后都写入存档
+        transfer_mode: 传输模式，normal 为单连接，turbo 为按站点配置的多连接分段下载，默认读取config.json
+    
+    Returns:
+        每个视频的结果列表: {'index', 'title', 'url', 'success', 'filepaths', 'error', 'skipped'}
+        其中filepaths为下载器报告的最终文件路径，skipped表示视频已在存档中而未下载
     """
-    try:
-        # 创建下载文件夹
-        download_folder = create_download_folder(use_timestamp=use_timestamp)
-        print(f"将下载视频到文件夹: {download_folder}")
+    # 创建下载文件夹
+    download_folder = create_download_folder(use_timestamp=use_timestamp, base_path=base_path)
+    print(f"将下载视频到文件夹: {download_folder}")
+    
+    # 所有视频共用进程内的下载引擎
+    engine = get_engine()
+    archive = get_download_archive()
+    
+    if videos and selected_indices:
+        jobs = [
+            {'index': idx, 'title': videos[idx]['title'], 'url': videos[idx]['url']}
+            for idx in selected_indices if 0 <= idx < len(videos)
+        ]
+        archive_ids = {idx: videos[idx].get('archive_id') for idx in selected_indices if 0 <= idx < len(videos)}
+    else:
+        jobs = [{'index': 0, 'title': url, 'url': url}]
+        archive_ids = {}
+    
+    results = []
+    
+    def finish(result):
+        results.append(result)
+        DOWNLOADS.inc(result=_result_label(result))
+        if on_result:
+            on_result(result)
+    
+    if skip_downloaded:
+        # 存档中已有的视频直接跳过，不进入调度
+        downloaded = archive.downloaded(archive_ids.values())
+        pending = []
+        for job in jobs:
+            if archive_ids.get(job['index']) in downloaded:
+                print(f"⏭️ 已下载过，跳过: {job['title']}")
+                finish({**job, 'success': True, 'filepaths': [], 'error': None, 'skipped': True})
+            else:
+                pending.append(job)
+        jobs = pending
+    else:
+        # 重新下载：先删除存档记录（下载失败时不再标记为已下载），解析后才知道ID的视频也不跳过
+        for archive_id in archive_ids.values():
+            if archive_id:
+                archive.remove(archive_id)
+        archive = archive.record_only()
+    
+    # 并发名额在进程内所有下载任务之间共享
+    scheduler = get_download_scheduler()
+    # 并行下载时关闭yt-dlp自身的进度输出，避免多个进度条互相覆盖
+    quiet = (max_workers or scheduler.max_workers) > 1 and len(jobs) > 1
+    
+    def download_job(job):
+        QUEUE_DEPTH.dec(queue='download')
+        print(f"\n正在下载: {job['title']}")
+        key = str(job['index'])
+        tracker = _TransferTracker()
         
-        # 获取正确的Python解释器路径
-        python_exe = get_python_executable()
+        def progress_hook(status):
+            tracker.on_progress(status)
+            if on_progress:
+                on_progress(ProgressEvent.from_ytdlp(key, job['title'], status))
         
-        if videos and selected_indices:
-            # 下载选定的视频
-            for idx in selected_indices:
-                if 0 <= idx < len(videos):
-                    video = videos[idx]
-                    print(f"\n正在下载: {video['title']}")
-                    
-                    # 构建下载命令，使用正确的Python解释器
-                    download_cmd = [python_exe, "-m", "yt_dlp"]
-                    
-                    # 添加cookies
-                    if cookies_path and os.path.exists(cookies_path):
-                        download_cmd.extend(["--cookies", cookies_path])
-                    
-                    # 优化的清晰度选择策略：优先1080p，然后向下寻找最高可用清晰度
-                    # 新的格式选择逻辑：
-                    # 1. 首选1080p (height=1080)
-                    # 2. 如果没有1080p，选择小于等于1080p的最高清晰度
-                    # 3. 确保音视频都有
-                    format_selector = (
-                        "bestvideo[height=1080]+bestaudio/bestvideo[height<=1080]+bestaudio/"
-                        "best[height=1080]/best[height<=1080]/best"
-                    )
-                    download_cmd.extend(["-f", format_selector])
-                    
-                    # 输出格式
-                    download_cmd.extend([
-                        "-o", os.path.join(download_folder, "%(title)s.%(ext)s"),
-                        "--merge-output-format", "mp4",
-                        "--embed-thumbnail",
-                        video['url']
-                    ])
-                    
-                    subprocess.run(download_cmd, check=True)
-            
-            print("所选视频下载完成！")
+        def postprocessor_hook(status):
+            tracker.on_postprocessor(status)
+            if on_progress:
+                event = ProgressEvent.from_postprocessor(key, job['title'], status)
+                if event:
+                    on_progress(event)
+        
+        with ACTIVE_TASKS.track(stage='download'), STAGE_DURATION.time(stage='video'):
+            return engine.download(job['url'], download_folder, cookies_path, quiet=quiet,
+                                   progress_hook=progress_hook, postprocessor_hook=postprocessor_hook,
+                                   download_archive=archive, transfer=resolve_profile(job['url'], transfer_mode))
+    
+    QUEUE_DEPTH.inc(len(jobs), queue='download')
+    for outcome in scheduler.run(jobs, download_job, max_workers=max_workers):
+        result = {
+            **outcome['item'],
+            'success': outcome['success'],
+            'filepaths': outcome['result'] or [],
+            'error': outcome['error'],
+            # 解析后才发现已在存档中（如单个视频）时，下载器不返回文件
+            'skipped': outcome['success'] and not outcome['result']
+        }
+        if result['skipped']:
+            print(f"⏭️ 已下载过，跳过: {result['title']}")
+        elif result['success']:
+            print(f"✅ 下载完成: {result['title']}")
         else:
-            # 下载单个视频            print(f"\n正在下载单个视频: {url}")
-            
-            # 构建下载命令，使用正确的Python解释器
-            download_cmd = [python_exe, "-m", "yt_dlp"]
-            
-            # 添加cookies
-            if cookies_path and os.path.exists(cookies_path):
-                download_cmd.extend(["--cookies", cookies_path])
-            
-            # 优化的清晰度选择策略：优先1080p，然后向下寻找最高可用清晰度
-            # 新的格式选择逻辑：
-            # 1. 首选1080p (height=1080)
-            # 2. 如果没有1080p，选择小于等于1080p的最高清晰度
-            # 3. 确保音视频都有
-            format_selector = (
-                "bestvideo[height=1080]+bestaudio/bestvideo[height<=1080]+bestaudio/"
-                "best[height=1080]/best[height<=1080]/best"
-            )
-            download_cmd.extend(["-f", format_selector])
-            
-            # 输出格式
-            download_cmd.extend([
-                "-o", os.path.join(download_folder, "%(title)s.%(ext)s"),
-                "--merge-output-format", "mp4",
-                "--embed-thumbnail",
-                url
-            ])
-            
-            subprocess.run(download_cmd, check=True)
-            print("下载完成！")
-    except subprocess.CalledProcessError as e:
-        print(f"下载过程中出错：{e}")
+            print(f"❌ 下载失败: {result['title']} - {result['error']}")
+        finish(result)
+    
+    successful = sum(1 for result in results if result['success'] and not result['skipped'])
+    skipped = sum(1 for result in results if result['skipped'])
+    print(f"下载结束：成功 {successful} 个，跳过 {skipped} 个，失败 {len(results) - successful - skipped} 个")
+    return results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="下载视频或合集（交互式选择）")
+    parser.add_argument("--redownload", action="store_true",
+                        help="重新下载已在下载存档中的视频（如文件已被删除或移动）")
+    return parser.parse_args(argv)
 
-def main():
+def main(argv=None):
     """命令行主函数"""
-    # 获取当前目录
-    current_dir = os.getcwd()
-    
+    args = parse_args(argv)
     # 提示用户输入URL
     url = input("请输入要下载的视频URL: ")
     
-    # 构建cookies路径
-    cookies_path = os.path.join(current_dir, "cookies.txt")
+    # cookies路径由配置模块统一提供
+    cookies_path = get_cookies_path()
     
     try:
         # 检查是否为合集
-        is_playlist, output_lines = check_playlist(url)
+        is_playlist, entries = check_playlist(url, cookies_path)
         
-        if is_playlist and output_lines:
-            videos = get_playlist_videos(output_lines)
+        if is_playlist and entries:
+            videos = get_playlist_videos(entries)
             
             if not videos:
                 print("无法解析合集中的视频，将尝试直接下载...")
-                download_videos(url, cookies_path=cookies_path, use_timestamp=True)
+                download_videos(url, cookies_path=cookies_path, use_timestamp=True,
+                                skip_downloaded=not args.redownload)
                 return
             
             # 获取真实视频标题（使用标题模块）
@@ -242,12 +352,14 @@ def main():
                 try:
                     # 将输入的序号转换为索引（减1，因为展示给用户时是从1开始的）
                     selected_indices = [int(idx.strip()) - 1 for idx in choice.split(',') if idx.strip()]
-                    download_videos(url, videos, selected_indices, cookies_path, use_timestamp=True)
+                    download_videos(url, videos, selected_indices, cookies_path, use_timestamp=True,
+                                    skip_downloaded=not args.redownload)
                 except ValueError:
                     print("输入格式错误，请输入数字，用逗号分隔。")
             else:
                 # 下载全部视频
-                download_videos(url, videos, list(range(len(videos))), cookies_path, use_timestamp=True)
+                download_videos(url, videos, list(range(len(videos))), cookies_path, use_timestamp=True,
+                                skip_downloaded=not args.redownload)
         else:
             # 单个视频，获取标题并下载
             print("\n正在获取单个视频标题...")
@@ -265,10 +377,12 @@ def main():
             if enhanced_videos and enhanced_videos[0].get('title'):
                 print(f"\n获取到视频标题: {enhanced_videos[0]['title']}")
                 # 使用增强后的视频信息下载
-                download_videos(url, enhanced_videos, [0], cookies_path, use_timestamp=True)
+                download_videos(url, enhanced_videos, [0], cookies_path, use_timestamp=True,
+                                skip_downloaded=not args.redownload)
             else:
                 print("\n无法获取视频标题，使用默认方式下载")
-                download_videos(url, cookies_path=cookies_path, use_timestamp=True)
+                download_videos(url, cookies_path=cookies_path, use_timestamp=True,
+                                skip_downloaded=not args.redownload)
     except FileNotFoundError:
         print("yt-dlp未安装或没有添加到环境变量中。")
     except Exception as e:
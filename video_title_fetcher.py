@@ -3,52 +3,134 @@
 支持 B站、YouTube 和其他网站的视频标题获取
 """
 
+import asyncio
+import html
 import httpx
+import importlib.util
 import re
 import json
-import subprocess
-import os
+import threading
+import time
 from typing import List, Dict, Optional, Tuple
 from urllib.parse import urlparse, parse_qs
 
+from download_engine import get_engine
+from metadata_cache import MetadataCache, get_metadata_cache
+from metrics import STAGE_DURATION, TITLES
+from settings import get_empty_cookie_jar, load_config, load_cookies
+
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+DEFAULT_TITLE_CONCURRENCY = 8
+# 连接池默认参数，可在config.json的 http_pool 中覆盖
+DEFAULT_HTTP_POOL = {
+    'max_connections': 20,
+    'max_keepalive_connections': 10,
+    'keepalive_expiry': 60.0,
+}
+
+
+def http2_available() -> bool:
+    """是否安装了 HTTP/2 支持（h2，随 httpx[http2] 安装），未安装时使用 HTTP/1.1 keep-alive"""
+    return importlib.util.find_spec('h2') is not None
+
+
+class TitleFetcherService:
+    """
+    常驻的标题获取服务，与Web服务器同生命周期
+    持有进程内共享的 httpx 连接池（同步客户端和运行在后台事件循环中的异步客户端），
+    多次分析之间复用已建立的连接，不再每次重新进行DNS解析和TCP/TLS握手
+    """
+    
+    def __init__(self, pool: Optional[Dict] = None, http2: Optional[bool] = None):
+        """
+        Args:
+            pool: 连接池参数（max_connections / max_keepalive_connections / keepalive_expiry），
+                  默认读取config.json的 http_pool
+            http2: 是否启用HTTP/2，默认在安装了 h2 时启用
+        """
+        pool = {**DEFAULT_HTTP_POOL, **(load_config().get('http_pool') or {}), **(pool or {})}
+        self.limits = httpx.Limits(**pool)
+        self.http2 = http2_available() if http2 is None else http2
+        self._clients: Dict[Optional[str], httpx.Client] = {}
+        self._async_clients: Dict[Optional[str], httpx.AsyncClient] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+    
+    def _client_options(self, cookies_path: Optional[str]) -> Dict:
+        return {
+            'timeout': 30.0,
+            'headers': {'User-Agent': USER_AGENT},
+            'cookies': self._cookie_jar(cookies_path),
+            'limits': self.limits,
+            'http2': self.http2,
+        }
+    
+    @staticmethod
+    def _cookie_jar(cookies_path: Optional[str]):
+        return load_cookies(cookies_path) if cookies_path else get_empty_cookie_jar()
+    
+    def _get_or_create(self, clients: Dict, cookies_path: Optional[str], factory):
+        jar = self._cookie_jar(cookies_path)
+        with self._lock:
+            client = clients.get(cookies_path)
+            if client is None:
+                client = clients[cookies_path] = factory()
+            elif client.cookies.jar is not jar:
+                # cookies文件变化后换用新的 jar，连接池保持不变
+                client.cookies = jar
+        return client
+    
+    def client(self, cookies_path: Optional[str] = None) -> httpx.Client:
+        """共享的同步客户端（每个cookies文件一个）"""
+        return self._get_or_create(
+            self._clients, cookies_path, lambda: httpx.Client(**self._client_options(cookies_path))
+        )
+    
+    def async_client(self, cookies_path: Optional[str] = None) -> httpx.AsyncClient:
+        """共享的异步客户端，只能在 run() 的事件循环中使用"""
+        return self._get_or_create(
+            self._async_clients, cookies_path,
+            lambda: httpx.AsyncClient(follow_redirects=True, **self._client_options(cookies_path))
+        )
+    
+    def run(self, coro):
+        """
+        在服务的常驻事件循环中运行协程并等待结果
+        异步客户端的连接绑定在该循环上，因此所有异步请求都经由这里执行
+        """
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="title-fetcher-loop", daemon=True).start()
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+    
+    def close(self):
+        """关闭所有连接并停止事件循环"""
+        with self._lock:
+            clients = list(self._clients.values())
+            async_clients = list(self._async_clients.values())
+            self._clients.clear()
+            self._async_clients.clear()
+            loop, self._loop = self._loop, None
+        for client in clients:
+            client.close()
+        if loop is not None:
+            for client in async_clients:
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+
 
 class VideoTitleFetcher:
-    def __init__(self, cookies_path: Optional[str] = None):
+    def __init__(self, cookies_path: Optional[str] = None, cache: Optional[MetadataCache] = None,
+                 service: Optional[TitleFetcherService] = None):
         self.cookies_path = cookies_path
-        self.session = httpx.Client(
-            timeout=30.0,
-            headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-        )
-        self._load_cookies()
-    def _load_cookies(self):
-        """加载 cookies 文件"""
-        if self.cookies_path and os.path.exists(self.cookies_path):
-            try:
-                with open(self.cookies_path, 'r', encoding='utf-8') as f:
-                    # 解析 Netscape cookie 格式
-                    cookies_dict = {}
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#'):
-                            parts = line.split('\t')
-                            if len(parts) >= 7:
-                                domain = parts[0]
-                                name = parts[5]
-                                value = parts[6]
-                                if 'bilibili' in domain or 'youtube' in domain:
-                                    cookies_dict[name] = value
-                    
-                    if cookies_dict:
-                        # 设置 cookies 到 session
-                        for name, value in cookies_dict.items():
-                            self.session.cookies.set(name, value)
-                        # 减少输出信息
-                        pass
-            except Exception:
-                # 减少错误输出
-                pass
+        self.cache = cache if cache is not None else get_metadata_cache()
+        self.service = service if service is not None else get_title_service()
+        self._used_fallback = False
+        # 使用服务的共享连接池；cookie jar 按域名区分，并与进程内下载引擎共用
+        self.session = self.service.client(cookies_path)
     def detect_platform(self, url: str) -> str:
         """检测视频平台"""
         if 'bilibili.com' in url or 'b23.tv' in url:
@@ -173,15 +255,11 @@ class VideoTitleFetcher:
         # 如果失败，尝试使用备选方法 - yt-dlp获取播放列表信息
         try:
             print("🔄 使用yt-dlp获取播放列表信息...")
-            cmd = ["yt-dlp", "--get-title", "--playlist-items", "1", f"https://www.youtube.com/playlist?list={list_id}"]
-            
-            if self.cookies_path and os.path.exists(self.cookies_path):
-                cmd.extend(["--cookies", self.cookies_path])
+            playlist_title = get_engine().extract_title(
+                f"https://www.youtube.com/playlist?list={list_id}", self.cookies_path
+            )
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            
-            if result.returncode == 0 and result.stdout.strip():
-                playlist_title = result.stdout.strip()
+            if playlist_title:
                 print(f"✅ yt-dlp成功获取播放列表标题: {playlist_title}")
                 return {
                     'title': playlist_title,
@@ -210,41 +288,65 @@ class VideoTitleFetcher:
         
         return None
     
-    def get_titles_via_ytdlp(self, videos: List[Dict], max_videos: int = 10) -> List[Dict]:
-        """使用 yt-dlp 获取视频标题（备用方案）"""
-        print(f"正在通过 yt-dlp 获取前 {min(max_videos, len(videos))} 个视频的真实标题...")
+    def resolve_titles_concurrently(self, videos: List[Dict]) -> List[Dict]:
+        """并发获取每个视频的真实标题（HTTP优先，失败时使用 yt-dlp）"""
+        print(f"正在并发获取 {len(videos)} 个视频的真实标题...")
         
-        for i, video in enumerate(videos[:max_videos]):
-            try:
-                print(f"获取第 {i+1} 个视频标题...")
-                cmd = ["yt-dlp", "--get-title"]
-                if self.cookies_path and os.path.exists(self.cookies_path):
-                    cmd.extend(["--cookies", self.cookies_path])
-                cmd.append(video['url'])
-                
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-                if result.returncode == 0 and result.stdout.strip():
-                    real_title = result.stdout.strip()
-                    video['title'] = real_title
-                    print(f"✓ 获取成功: {real_title}")
-                else:
-                    print(f"✗ 获取失败，保持原标题: {video['title']}")
-            except subprocess.TimeoutExpired:
-                print(f"✗ 获取超时，保持原标题: {video['title']}")
-            except Exception as e:
-                print(f"✗ 获取出错: {e}，保持原标题: {video['title']}")
+        resolver = AsyncTitleResolver(self.cookies_path, service=self.service)
+        resolved = self.service.run(resolver.resolve(videos))
         
-        if len(videos) > max_videos:
-            print(f"注意：只获取了前 {max_videos} 个视频的真实标题，其余视频将在下载时显示真实标题")
+        failed = len(videos) - resolved
+        if failed:
+            self._used_fallback = True
+            print(f"✗ {failed} 个视频获取标题失败，保持原标题")
+        print(f"✓ 成功获取 {resolved}/{len(videos)} 个视频标题")
         
         return videos
+    
     def enhance_videos(self, videos: List[Dict], url: str) -> List[Dict]:
         """
-        增强视频标题信息（主方法）
+        增强视频标题信息（主方法），优先使用缓存
         """
         if not videos:
             return videos
         
+        if self.cache:
+            cached = self.cache.get('titles', url)
+            if cached and self._apply_cached_titles(videos, cached):
+                print("✅ 使用缓存的视频标题")
+                TITLES.inc(len(videos), source='cache')
+                return videos
+        
+        self._used_fallback = False
+        with STAGE_DURATION.time(stage='titles'):
+            videos = self._fetch_titles(videos, url)
+        
+        # 回退标题只是占位符，不写入缓存
+        if self.cache and not self._used_fallback:
+            self.cache.set('titles', url, {
+                self._title_cache_key(video): {'title': video.get('title'), 'duration': video.get('duration')}
+                for video in videos
+            })
+        return videos
+    
+    @staticmethod
+    def _title_cache_key(video: Dict) -> str:
+        """视频在标题缓存中的键"""
+        return video.get('url') or str(video.get('playlist_index', ''))
+    
+    def _apply_cached_titles(self, videos: List[Dict], cached: Dict) -> bool:
+        """用缓存的标题填充视频列表，缓存未覆盖全部视频时返回False"""
+        keys = [self._title_cache_key(video) for video in videos]
+        if not all(key in cached for key in keys):
+            return False
+        for video, key in zip(videos, keys):
+            video['title'] = cached[key]['title']
+            if cached[key].get('duration'):
+                video['duration'] = cached[key]['duration']
+        return True
+    
+    def _fetch_titles(self, videos: List[Dict], url: str) -> List[Dict]:
+        """按平台获取视频标题"""
         platform = self.detect_platform(url)
         
         # 根据平台类型选择对应的标题获取方法
@@ -253,15 +355,136 @@ class VideoTitleFetcher:
         elif platform == 'youtube':
             return self._enhance_youtube_titles(videos, url)
         else:
-            # 根据视频数量选择备选方案
-            if len(videos) <= 10:
-                return self.get_titles_via_ytdlp(videos, max_videos=len(videos))
-            else:
-                return self._use_fallback_titles(videos)
+            return self._resolve_missing_titles(videos)
+    
+    def get_bilibili_collection_entries(self, url: str, video_info: Optional[Dict] = None) -> Dict[str, Dict]:
+        """
+        批量获取B站合集（UGC合集 / 视频列表）中所有视频的标题、时长和cid
+        
+        Args:
+            url: 合集中任一视频的URL，或空间中的合集/视频列表URL
+            video_info: 已获取的视频信息（/x/web-interface/view 的返回值）
+        
+        Returns:
+            {bvid: {'title': 标题, 'duration': 时长秒数, 'cid': cid}}
+        """
+        space_match = re.search(
+            r'space\.bilibili\.com/(\d+)/(?:channel/(collectiondetail|seriesdetail)\?sid=(\d+)|lists/(\d+))', url
+        )
+        if space_match:
+            mid = space_match.group(1)
+            list_id = space_match.group(3) or space_match.group(4)
+            if space_match.group(2) == 'seriesdetail' or 'type=series' in url:
+                return self._fetch_bilibili_archives(
+                    "https://api.bilibili.com/x/series/archives",
+                    {'mid': mid, 'series_id': list_id, 'only_normal': 'true', 'sort': 'asc'},
+                    'pn', 'ps'
+                )
+            return self._fetch_bilibili_archives(
+                "https://api.bilibili.com/x/polymer/web-space/seasons_archives_list",
+                {'mid': mid, 'season_id': list_id, 'sort_reverse': 'false'},
+                'page_num', 'page_size'
+            )
+        
+        season = (video_info or {}).get('ugc_season')
+        if not season:
+            return {}
+        
+        # 视频详情中通常已包含整个合集的分集列表
+        entries = {}
+        for section in season.get('sections', []):
+            for episode in section.get('episodes', []):
+                entries[episode['bvid']] = {
+                    'title': episode.get('title'),
+                    'duration': (episode.get('arc') or {}).get('duration') or (episode.get('page') or {}).get('duration'),
+                    'cid': episode.get('cid'),
+                }
+        
+        # 分集列表不完整时分页补全
+        if len(entries) < season.get('ep_count', 0):
+            mid = (video_info.get('owner') or {}).get('mid') or season.get('mid')
+            archives = self._fetch_bilibili_archives(
+                "https://api.bilibili.com/x/polymer/web-space/seasons_archives_list",
+                {'mid': mid, 'season_id': season.get('id'), 'sort_reverse': 'false'},
+                'page_num', 'page_size'
+            )
+            for bvid, entry in archives.items():
+                entries.setdefault(bvid, entry)
+        
+        return entries
+    
+    def _fetch_bilibili_archives(self, api_url: str, params: Dict, page_key: str, size_key: str,
+                                 page_size: int = 100, max_pages: int = 200) -> Dict[str, Dict]:
+        """分页获取B站合集/视频列表中的全部视频"""
+        entries = {}
+        for page_num in range(1, max_pages + 1):
+            try:
+                response = self.session.get(api_url, params={**params, page_key: page_num, size_key: page_size})
+                if response.status_code != 200:
+                    break
+                data = response.json()
+            except Exception:
+                break
+            if data.get('code') != 0:
+                break
+            
+            archives = (data.get('data') or {}).get('archives') or []
+            for archive in archives:
+                entries[archive['bvid']] = {
+                    'title': archive.get('title'),
+                    'duration': archive.get('duration'),
+                    'cid': archive.get('cid'),
+                }
+            
+            total = ((data.get('data') or {}).get('page') or {}).get('total', 0)
+            if not archives or len(entries) >= total:
+                break
+        return entries
+    
+    @staticmethod
+    def _extract_bvid(text: str) -> Optional[str]:
+        """从视频ID或URL中提取BV号"""
+        bv_match = re.search(r'BV([a-zA-Z0-9]+)', text or '')
+        return f"BV{bv_match.group(1)}" if bv_match else None
+    
+    @staticmethod
+    def _format_duration(duration: int) -> str:
+        """将秒数格式化为 分:秒"""
+        minutes = duration // 60
+        seconds = duration % 60
+        return f"{minutes:02d}:{seconds:02d}"
+    
     def _enhance_bilibili_titles(self, videos: List[Dict], url: str) -> List[Dict]:
         """增强B站视频标题"""
         
         video_info = self.get_bilibili_video_info(url)
+        
+        # 合集中的视频是不同的BV号时，分页批量获取整个合集，而不是逐个请求
+        bvids = {self._extract_bvid(video.get('id') or video.get('url', '')) for video in videos}
+        bvids.discard(None)
+        if len(bvids) > 1 or (not video_info and 'space.bilibili.com' in url):
+            entries = self.get_bilibili_collection_entries(url, video_info)
+            if entries:
+                print(f"✅ 批量获取到 {len(entries)} 个合集视频的信息")
+            
+            missing = []
+            for video in videos:
+                entry = entries.get(self._extract_bvid(video.get('id') or video.get('url', '')))
+                if entry and entry.get('title'):
+                    video['title'] = entry['title']
+                    TITLES.inc(source='batch')
+                    if entry.get('duration'):
+                        video['duration'] = self._format_duration(entry['duration'])
+                    if entry.get('cid'):
+                        video['cid'] = entry['cid']
+                else:
+                    missing.append(video)
+            
+            # 合集接口未覆盖的视频再逐个并发获取
+            if missing:
+                self.resolve_titles_concurrently(missing)
+            return videos
+        
         if video_info:
             pages = video_info.get('pages', [])
             main_title = video_info.get('title', '')
@@ -282,67 +505,58 @@ class VideoTitleFetcher:
                     video['title'] = f"{main_title} - {part_title}"
                     # 添加时长信息
                     if 'duration' in matching_page:
-                        duration = matching_page['duration']
-                        minutes = duration // 60
-                        seconds = duration % 60
-                        video['duration'] = f"{minutes:02d}:{seconds:02d}"
+                        video['duration'] = self._format_duration(matching_page['duration'])
+                    if 'cid' in matching_page:
+                        video['cid'] = matching_page['cid']
                 else:
+                    # 接口中没有对应的分P，只能使用占位标题，不写入缓存
                     video['title'] = f"{main_title} - P{playlist_index}"
+                    self._used_fallback = True
             
+            TITLES.inc(len(videos), source='batch')
             return videos
         else:
+            # 视频信息获取失败时逐个获取，仍然失败的视频才使用回退标题
+            self._resolve_missing_titles(videos)
+            if all(self._has_title(video) for video in videos):
+                return videos
             return self._use_fallback_titles(videos)
     
     def _enhance_youtube_titles(self, videos: List[Dict], url: str) -> List[Dict]:
         """增强YouTube视频标题"""
         print("🔄 正在获取YouTube视频标题...")
         
-        # 检查是否为播放列表
-        if 'list=' in url:
+        if len(videos) > 1 or 'list=' in url:
+            # 播放列表的扁平化解析结果已包含每个视频的真实标题，只需补全缺少标题的视频
             print("📋 检测到YouTube播放列表")
-            
-            # 获取播放列表信息
-            parsed = urlparse(url)
-            list_id = parse_qs(parsed.query).get('list', [None])[0]
-            
-            if list_id:
-                print(f"📋 播放列表ID: {list_id}")
-                video_info = self._get_youtube_playlist_info(list_id)
-                
-                if video_info:
-                    # 使用播放列表信息处理标题
-                    playlist_title = video_info.get('title', '')
-                    print(f"📋 播放列表标题: {playlist_title}")
-                    
-                    for i, video in enumerate(videos):
-                        playlist_index = video.get('playlist_index', i + 1)
-                        video['title'] = f"{playlist_title} - {playlist_index}"
-                    
-                    return videos
+            return self._resolve_missing_titles(videos)
         
         # 获取单个视频信息
         video_info = self.get_youtube_video_info(url)
-        if video_info:
+        if video_info and video_info.get('title'):
             print("🎬 获取到YouTube视频信息")
-            main_title = video_info.get('title', '')
-            
-            if len(videos) == 1:
-                # 单个视频情况
-                videos[0]['title'] = main_title
-            else:
-                # 多个视频但不是播放列表的情况
-                for i, video in enumerate(videos):
-                    playlist_index = video.get('playlist_index', i + 1)
-                    video['title'] = f"{main_title} - Part {playlist_index}"
-            
+            videos[0]['title'] = video_info['title']
+            TITLES.inc(source='http')
             return videos
         
         # 如果前面的方法都失败，尝试使用yt-dlp
-        print("⚠️ 使用yt-dlp备选方案获取YouTube视频标题")
-        if len(videos) <= 10:
-            return self.get_titles_via_ytdlp(videos, max_videos=len(videos))
-        else:
-            return self._use_fallback_titles(videos)
+        print("⚠️ 逐个获取YouTube视频标题")
+        return self.resolve_titles_concurrently(videos)
+    
+    @staticmethod
+    def _has_title(video: Dict) -> bool:
+        """视频是否已有真实标题（而不是解析时的临时标题：单个视频为“视频”，合集条目为“视频_序号”）"""
+        title = video.get('title')
+        return bool(title) and title != '视频' and not title.startswith('视频_') and \
+            title not in (video.get('url'), video.get('id'))
+    
+    def _resolve_missing_titles(self, videos: List[Dict]) -> List[Dict]:
+        """保留已有的真实标题，只并发获取缺少标题的视频"""
+        missing = [video for video in videos if not self._has_title(video)]
+        TITLES.inc(len(videos) - len(missing), source='batch')
+        if missing:
+            self.resolve_titles_concurrently(missing)
+        return videos
     
     # _enhance_other_titles方法已被移除
     # 处理逻辑已合并到主方法enhance_videos中
@@ -350,6 +564,7 @@ class VideoTitleFetcher:
     def _use_fallback_titles(self, videos: List[Dict]) -> List[Dict]:
         """使用回退标题方案（合集标题+索引）"""
         print("⚠️ 使用回退标题方案")
+        self._used_fallback = True
         for video in videos:
             if not video.get('title') or video['title'].startswith('视频_'):
                 playlist_title = video.get('playlist_title', '')
@@ -363,9 +578,8 @@ class VideoTitleFetcher:
         return videos
     
     def close(self):
-        """关闭会话"""
-        if hasattr(self, 'session'):
-            self.session.close()
+        """会话属于共享的服务，不在这里关闭，连接留给后续请求复用"""
+        self.session = None
     
     def __enter__(self):
         return self
@@ -374,6 +588,107 @@ class VideoTitleFetcher:
         self.close()
 
 
+class AsyncTitleResolver:
+    """基于 httpx.AsyncClient 的并发标题解析器"""
+    
+    def __init__(self, cookies_path: Optional[str] = None, service: Optional[TitleFetcherService] = None,
+                 concurrency: int = DEFAULT_TITLE_CONCURRENCY):
+        self.cookies_path = cookies_path
+        self.service = service if service is not None else get_title_service()
+        self.concurrency = max(1, concurrency)
+    
+    async def resolve(self, videos: List[Dict]) -> int:
+        """
+        并发解析所有视频的标题并原地更新，返回成功数量
+        需在服务的事件循环中运行（TitleFetcherService.run）
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        client = self.service.async_client(self.cookies_path)
+        results = await asyncio.gather(
+            *(self._resolve_one(client, semaphore, video) for video in videos)
+        )
+        return sum(results)
+    
+    async def _resolve_one(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, video: Dict) -> bool:
+        url = video.get('url')
+        if not url:
+            return False
+        
+        async with semaphore:
+            title = None
+            source = 'http'
+            started = time.perf_counter()
+            try:
+                if 'bilibili.com' in url or 'b23.tv' in url:
+                    title = await self._fetch_bilibili_title(client, url)
+                elif 'youtube.com' in url or 'youtu.be' in url:
+                    title = await self._fetch_page_title(client, url)
+            except Exception:
+                title = None
+            
+            if not title:
+                # HTTP方式失败时，在线程池中使用进程内的 yt-dlp
+                source = 'ytdlp'
+                try:
+                    title = await asyncio.to_thread(get_engine().extract_title, url, self.cookies_path)
+                except Exception:
+                    title = None
+            STAGE_DURATION.observe(time.perf_counter() - started, stage='title_' + source)
+        
+        TITLES.inc(source=source if title else 'failed')
+        if title:
+            video['title'] = title
+            return True
+        return False
+    
+    async def _fetch_bilibili_title(self, client: httpx.AsyncClient, url: str) -> Optional[str]:
+        bv_match = re.search(r'BV([a-zA-Z0-9]+)', url)
+        if not bv_match:
+            return None
+        response = await client.get(
+            "https://api.bilibili.com/x/web-interface/view",
+            params={'bvid': f"BV{bv_match.group(1)}"}
+        )
+        if response.status_code == 200:
+            data = response.json()
+            if data.get('code') == 0:
+                return data['data'].get('title')
+        return None
+    
+    async def _fetch_page_title(self, client: httpx.AsyncClient, url: str) -> Optional[str]:
+        response = await client.get(url)
+        if response.status_code == 200:
+            title_match = re.search(r'<title>([^<]+)</title>', response.text)
+            if title_match:
+                title = html.unescape(title_match.group(1)).replace(' - YouTube', '').strip()
+                # YouTube对未解析的页面只返回 "YouTube"
+                if title and title != 'YouTube':
+                    return title
+        return None
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_title_service() -> TitleFetcherService:
+    """获取进程内共享的标题获取服务"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = TitleFetcherService()
+        return _service
+
+
+def close_title_service():
+    """关闭共享的标题获取服务（未创建过时不做任何事），之后再次使用会重新创建"""
+    global _service
+    with _service_lock:
+        service, _service = _service, None
+    if service is not None:
+        service.close()
+
+
 def enhance_video_titles(videos: List[Dict], url: str, cookies_path: Optional[str] = None) -> List[Dict]:
     """
     便捷函数：增强视频标题信息
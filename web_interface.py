@@ -1,108 +1,137 @@
-import gradio as gr
+from startup import startup_timer
+
 import os
 import sys
-import subprocess
+import shutil
 import json
 import time
+import _thread
 from datetime import datetime
 from pathlib import Path
 from typing import List, Tuple, Optional
 import threading
 import queue
 
-# 导入视频下载功能
-from video_dlp import check_playlist, get_playlist_videos, download_videos, get_python_executable
-from video_title_fetcher import enhance_video_titles
-# 导入音频提取功能
-from sperate_audio import convert_to_audio
+with startup_timer.stage("导入 gradio"):
+    import gradio as gr
 
+# 只导入构建界面所需的轻量模块；yt-dlp、httpx 等下载相关模块在首次使用时才导入，
+# 端口就绪后再在后台线程中预加载
+with startup_timer.stage("导入界面模块"):
+    # 导入音频提取功能
+    from sperate_audio import ExtractionStage, AUDIO_FORMAT_CHOICES
+    from job_manager import get_job_manager
+    from job_store import get_job_store, ITEM_DOWNLOADED, ITEM_FAILED
+    from progress import ProgressEvent, ProgressThrottle
+    from settings import get_download_path, get_cookies_path, load_config, load_cookies
+    from bandwidth import format_rate, get_bandwidth_governor, parse_rate
+    from metrics import DEFAULT_METRICS_PORT, STAGE_DURATION, start_metrics_server
 
-def get_download_path():
-    """从config.json获取下载路径"""
-    try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        config_path = os.path.join(script_dir, "config.json")
-        
-        if os.path.exists(config_path):
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                return config.get('download_path', r"C:\Users\chenw\Videos")
-        else:
-            return r"C:\Users\chenw\Videos"
-    except Exception as e:
-        print(f"读取配置文件失败: {e}")
-        return r"C:\Users\chenw\Videos"
+
+# 获取大合集时界面部分更新的最小间隔（秒）
+PARTIAL_UPDATE_INTERVAL = 0.5
 
 
 def check_cookies_status():
-    """检查cookies文件状态"""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    cookies_path = os.path.join(script_dir, "cookies.txt")
+    """检查cookies文件状态（解析结果由配置模块缓存，文件变化后才重新读取）"""
+    cookies_path = get_cookies_path()
     
     if os.path.exists(cookies_path):
-        try:
-            with open(cookies_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                lines = [line for line in content.split('\n') if line.strip() and not line.startswith('#')]
-                return f"✅ Cookies文件已加载，包含 {len(lines)} 条记录"
-        except Exception:
-            return "❌ Cookies文件读取失败"
+        cookies = load_cookies(cookies_path)
+        if cookies:
+            return f"✅ Cookies文件已加载，包含 {len(cookies)} 条记录"
+        return "❌ Cookies文件读取失败或没有有效记录"
     else:
         return "⚠️ 未找到cookies.txt文件，某些网站可能无法访问"
 
 
+def _video_choices(videos):
+    """视频选择列表的显示文本，已下载过的视频加上标记"""
+    video_choices = []
+    for i, video in enumerate(videos):
+        choice_text = f"{i+1}. {video['title']}"
+        if video.get('downloaded'):
+            choice_text += " （已下载）"
+        video_choices.append(choice_text)
+    return video_choices
+
+
 def analyze_video_url(url):
-    """分析视频URL获取视频列表"""
+    """
+    分析视频URL获取视频列表
+    生成器：合集条目边获取边产出部分结果，枚举完成并获取真实标题后产出最终结果
+    """
     if not url.strip():
-        return (
+        yield (
             get_download_path(),
             check_cookies_status(),
             "⚠️ 请输入有效的URL",
             [],  # choices
             ""   # video_data_storage
         )
+        return
+    
+    from video_dlp import iter_playlist, get_playlist_videos
+    from video_title_fetcher import enhance_video_titles
     
+    started = time.perf_counter()
     try:
         print(f"🔍 开始分析URL: {url}")
         
-        # 使用 video_dlp.py 的函数检查是否为合集
-        is_playlist, output_lines = check_playlist(url)
+        # 获取cookies路径
+        cookies_path = get_cookies_path()
+        
+        # 使用 video_dlp.py 的函数流式检查是否为合集，先显示已获取的条目
+        # 每页只解析新增的条目；界面更新合并为每 PARTIAL_UPDATE_INTERVAL 秒最多一次，
+        # 避免大合集每页都重新发送整个列表
+        is_playlist, entries = False, []
+        videos = []
+        parsed_count = 0
+        last_update = time.monotonic()
+        for is_playlist, entries in iter_playlist(url, cookies_path):
+            if not is_playlist:
+                continue
+            videos.extend(get_playlist_videos(entries[parsed_count:]))
+            parsed_count = len(entries)
+            if time.monotonic() - last_update >= PARTIAL_UPDATE_INTERVAL:
+                last_update = time.monotonic()
+                yield (
+                    get_download_path(),
+                    check_cookies_status(),
+                    f"⏳ 正在获取合集内容，已获取 {len(videos)} 个视频...",
+                    _video_choices(videos),  # choices
+                    json.dumps(videos)  # video_data_storage
+                )
         
-        if is_playlist and output_lines:
+        if is_playlist and entries:
             print("📋 检测到视频合集，正在解析...")
             
-            # 获取基础视频信息
-            videos = get_playlist_videos(output_lines)
-            
             if not videos:
-                return (
+                yield (
                     get_download_path(),
                     check_cookies_status(),
                     "❌ 无法解析合集内容",
                     [],  # choices
                     ""   # video_data_storage
                 )
+                return
             
             print(f"📊 解析到 {len(videos)} 个视频，正在获取真实标题...")
             
-            # 获取cookies路径
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            cookies_path = os.path.join(script_dir, "cookies.txt")
-            
             # 使用 enhance_video_titles 获取真实标题
             enhanced_videos = enhance_video_titles(videos, url, cookies_path)
             
             # 准备视频列表用于界面显示
-            video_choices = []
-            for i, video in enumerate(enhanced_videos):
-                choice_text = f"{i+1}. {video['title']}"
-                video_choices.append(choice_text)
+            video_choices = _video_choices(enhanced_videos)
             
             video_info = f"🎬 检测到视频合集，共 {len(enhanced_videos)} 个视频"
+            downloaded_count = sum(1 for video in enhanced_videos if video.get('downloaded'))
+            if downloaded_count:
+                video_info += f"，其中 {downloaded_count} 个已下载（下载时将跳过）"
             
             print(f"✅ 成功获取 {len(enhanced_videos)} 个视频的标题")
             
-            return (
+            yield (
                 get_download_path(),
                 check_cookies_status(),
                 video_info,
@@ -113,10 +142,6 @@ def analyze_video_url(url):
         else:
             print("📹 检测到单个视频，正在获取标题...")
             
-            # 单个视频处理
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            cookies_path = os.path.join(script_dir, "cookies.txt")
-            
             # 创建单个视频的数据结构
             single_video = [{
                 'title': '视频',
@@ -135,7 +160,7 @@ def analyze_video_url(url):
                 
                 print(f"✅ 获取到视频标题: {video_title}")
                 
-                return (
+                yield (
                     get_download_path(),
                     check_cookies_status(),
                     video_info,
@@ -143,7 +168,7 @@ def analyze_video_url(url):
                     json.dumps(enhanced_videos)  # video_data_storage
                 )
             else:
-                return (
+                yield (
                     get_download_path(),
                     check_cookies_status(),
                     "📹 检测到单个视频（无法获取标题）",
@@ -153,180 +178,270 @@ def analyze_video_url(url):
                 
     except Exception as e:
         print(f"❌ 分析失败: {e}")
-        return (
+        yield (
             get_download_path(),
             check_cookies_status(),
             f"❌ 分析失败: {str(e)}",
             [],  # choices
             ""   # video_data_storage
         )
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - started, stage='analyze')
 
 
 def analyze_and_auto_select(url):
-    """分析URL并自动选择第一个视频"""
+    """分析URL并自动选择第一个视频（生成器：获取大合集时持续刷新视频列表）"""
     print(f"🔍 开始分析URL: {url}")
     
     if not url.strip():
-        return "❌ 请输入URL", "", "", gr.CheckboxGroup(choices=[], value=[]), "", []
+        yield "❌ 请输入URL", "", "", gr.CheckboxGroup(choices=[], value=[]), "", []
+        return
     
     try:
-        # 调用分析函数
-        result = analyze_video_url(url)
-        
-        if len(result) < 5:
-            error_msg = result[0] if result else "❌ 分析失败"
-            return error_msg, "", "", gr.CheckboxGroup(choices=[], value=[]), "", []
-        
-        # 解析返回结果
-        download_path, cookies_status, video_info, video_choices_list, video_data_json = result
-        
-        print(f"📊 获取到 {len(video_choices_list)} 个视频选择")
-        
-        # 自动选择第一个视频
-        auto_selected = video_choices_list[:1] if video_choices_list else []
-        
-        # 创建同时包含choices和value的CheckboxGroup更新
-        updated_checkbox = gr.CheckboxGroup(
-            choices=video_choices_list,
-            value=auto_selected,
-            label="选择要下载的视频",
-            interactive=True
-        )
-        
-        print(f"🎯 自动选择: {auto_selected}")
-        
-        # 返回分析结果，video_selection只出现一次
-        return download_path, cookies_status, video_info, updated_checkbox, video_data_json, video_choices_list
+        # 调用分析函数，每产出一次结果就刷新一次界面
+        for result in analyze_video_url(url):
+            if len(result) < 5:
+                error_msg = result[0] if result else "❌ 分析失败"
+                yield error_msg, "", "", gr.CheckboxGroup(choices=[], value=[]), "", []
+                return
+            
+            # 解析返回结果
+            download_path, cookies_status, video_info, video_choices_list, video_data_json = result
+            
+            print(f"📊 获取到 {len(video_choices_list)} 个视频选择")
+            
+            # 自动选择第一个未下载过的视频
+            not_downloaded = [choice for choice in video_choices_list if not choice.endswith("（已下载）")]
+            auto_selected = not_downloaded[:1]
+            
+            # 创建同时包含choices和value的CheckboxGroup更新
+            updated_checkbox = gr.CheckboxGroup(
+                choices=video_choices_list,
+                value=auto_selected,
+                label="选择要下载的视频",
+                interactive=True
+            )
+            
+            # 返回分析结果，video_selection只出现一次
+            yield download_path, cookies_status, video_info, updated_checkbox, video_data_json, video_choices_list
         
     except Exception as e:
         print(f"❌ 分析并自动选择失败: {e}")
         import traceback
         traceback.print_exc()
-        return "❌ 分析失败", "", f"❌ 分析失败: {str(e)}", gr.CheckboxGroup(choices=[], value=[]), "", []
-
-
-def find_video_file(download_path, video_title):
-    """智能查找下载的视频文件"""
-    import glob
-    
-    # 常见的视频扩展名
-    video_extensions = ['mp4', 'mkv', 'webm', 'avi', 'mov', 'flv', 'm4v']
-    
-    # 首先尝试精确匹配（清理后的标题）
-    sanitized_title = video_title
-    for char in ['/', '\\', ':', '*', '?', '"', '<', '>', '|']:
-        sanitized_title = sanitized_title.replace(char, '_')
-    
-    for ext in video_extensions:
-        exact_path = os.path.join(download_path, f"{sanitized_title}.{ext}")
-        if os.path.exists(exact_path):
-            return exact_path
-    
-    # 如果精确匹配失败，尝试模糊匹配
-    # 提取标题的关键词
-    title_words = sanitized_title.split()[:3]  # 取前3个词
-    
-    for ext in video_extensions:
-        pattern = os.path.join(download_path, f"*.{ext}")
-        for file_path in glob.glob(pattern):
-            filename = os.path.basename(file_path)
-            # 检查文件名是否包含标题的关键词
-            if all(word.lower() in filename.lower() for word in title_words if len(word) > 2):
-                return file_path
-    
-    return None
+        yield "❌ 分析失败", "", f"❌ 分析失败: {str(e)}", gr.CheckboxGroup(choices=[], value=[]), "", []
 
 
 def download_single_video_with_progress(video, url, cookies_path, download_path, progress_queue, video_num, total_videos):
     """下载单个视频并报告进度"""
+    from download_engine import get_engine
+    from turbo import resolve_profile
+    from yt_dlp.utils import DownloadError
+    
     try:
-        python_exe = get_python_executable()
         video_title = video['title']
         
         progress_queue.put(f"🎬 ({video_num}/{total_videos}) 开始下载: {video_title}")
         
-        # 构建下载命令
-        download_cmd = [python_exe, "-m", "yt_dlp"]
-          # 添加cookies
-        if cookies_path and os.path.exists(cookies_path):
-            download_cmd.extend(["--cookies", cookies_path])
-        
-        # 优化的清晰度选择策略：优先1080p，然后向下寻找最高可用清晰度
-        # 格式选择逻辑与video_dlp模块保持一致：
-        # 1. 首选1080p (height=1080)
-        # 2. 如果没有1080p，选择小于等于1080p的最高清晰度
-        # 3. 确保音视频都有
-        format_selector = (
-            "bestvideo[height=1080]+bestaudio/bestvideo[height<=1080]+bestaudio/"
-            "best[height=1080]/best[height<=1080]/best"
-        )
+        key = str(video_num)
+        
+        def emit(events):
+            if key in events:
+                progress_queue.put(f"({video_num}/{total_videos}) {events[key].format()}")
+        
+        # 将yt-dlp的进度回调转换为结构化事件，合并后每秒最多推送几次
+        progress = ProgressThrottle(emit)
         
-        # 添加进度输出格式
-        download_cmd.extend([
-            "--newline",  # 每行输出进度信息
-            "-f", format_selector,
-            "-o", os.path.join(download_path, "%(title)s.%(ext)s"),
-            "--merge-output-format", "mp4",
-            "--embed-thumbnail",
-            video['url']
-        ])
-          # 启动下载进程
-        process = subprocess.Popen(
-            download_cmd, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.STDOUT, 
-            text=True,
-            universal_newlines=True
+        def on_progress(status):
+            progress.push(ProgressEvent.from_ytdlp(key, video_title, status))
+        
+        def on_postprocess(status):
+            event = ProgressEvent.from_postprocessor(key, video_title, status)
+            if event:
+                progress.push(event)
+        
+        # 使用进程内的下载引擎，不再为每个视频启动新的解释器
+        get_engine().download(
+            video['url'],
+            download_path,
+            cookies_path,
+            quiet=True,
+            progress_hook=on_progress,
+            postprocessor_hook=on_postprocess,
+            transfer=resolve_profile(video['url'])
         )
         
-        # 实时读取输出
-        last_progress = ""
-        if process.stdout:
-            for line in process.stdout:
-                line = line.strip()
-                if line:
-                    # 检测进度信息
-                    if "%" in line and ("ETA" in line or "of" in line):
-                        # 解析进度信息
-                        if line != last_progress:
-                            progress_queue.put(f"📥 ({video_num}/{total_videos}) {line}")
-                            last_progress = line
-                    elif "Downloading" in line:
-                        progress_queue.put(f"📂 ({video_num}/{total_videos}) {line}")
-                    elif "Merging" in line:
-                        progress_queue.put(f"🔄 ({video_num}/{total_videos}) 合并音视频...")
-                    elif "has already been downloaded" in line:
-                        progress_queue.put(f"⚠️ ({video_num}/{total_videos}) 文件已存在，跳过下载")
-        
-        # 等待进程完成
-        return_code = process.wait()
-        
-        if return_code == 0:
-            progress_queue.put(f"✅ ({video_num}/{total_videos}) 下载完成: {video_title}")
-            return True
-        else:
-            progress_queue.put(f"❌ ({video_num}/{total_videos}) 下载失败: {video_title}")
-            return False
+        progress_queue.put(f"✅ ({video_num}/{total_videos}) 下载完成: {video_title}")
+        return True
             
+    except DownloadError:
+        progress_queue.put(f"❌ ({video_num}/{total_videos}) 下载失败: {video_title}")
+        return False
     except Exception as e:
         progress_queue.put(f"❌ ({video_num}/{total_videos}) 下载异常: {str(e)}")
         return False
 
 
-def download_selected_videos(url, video_data_json, selected_videos, auto_extract_audio, audio_format, keep_original):
-    """下载选中的视频"""
+def run_download_job(job, job_id, url, videos, selected_indices, cookies_path, auto_extract_audio,
+                     audio_format, keep_original, download_folder, downloaded_items=None, redownload=False):
+    """
+    后台下载任务：并行下载选中的视频，并可选地流水线提取音频
+    每个视频的状态都写入任务记录，进程重启后可从未完成的视频继续
+
+    Args:
+        job: 后台任务对象，用于报告进度消息和实时下载进度
+        job_id: 任务记录ID
+        download_folder: 下载目录（恢复任务时沿用原目录，以便续传 .part 文件）
+        downloaded_items: 恢复任务时上次已下载的视频 {索引: 输出文件路径列表}，
+                          计入下载结果，并重新交给音频提取（提取清单会跳过已提取的文件）
+        redownload: 重新下载已在下载存档中的视频（如文件已被删除或移动）
+    
+    Returns:
+        最终结果文本
+    """
+    job_store = get_job_store()
+    try:
+        final_message = _run_download_job(
+            job, job_id, url, videos, selected_indices, cookies_path,
+            auto_extract_audio, audio_format, keep_original, download_folder, downloaded_items or {}, redownload
+        )
+    except Exception as e:
+        job_store.finish_job(job_id, f"❌ 处理失败: {str(e)}", status='failed')
+        raise
+    job_store.finish_job(job_id, final_message)
+    return final_message
+
+
+def _run_download_job(job, job_id, url, videos, selected_indices, cookies_path, auto_extract_audio,
+                      audio_format, keep_original, download_folder, downloaded_items, redownload):
+    """run_download_job 的具体流程"""
+    from video_dlp import download_videos
+    
+    report = job.report
+    job_store = get_job_store()
+    total_videos = len(selected_indices) + len(downloaded_items)
+    download_success_count = len(downloaded_items)
+    audio_success_count = 0  # 在开始就初始化
+
+    report(f"🚀 开始批量下载任务，共 {total_videos} 个视频")
+    if downloaded_items:
+        report(f"♻️ 上次已下载 {len(downloaded_items)} 个视频，继续剩余的 {len(selected_indices)} 个")
+
+    # 显示要下载的视频列表
+    for i, idx in enumerate(selected_indices, 1):
+        if 0 <= idx < len(videos):
+            video = videos[idx]
+            report(f"📋 ({i}/{total_videos}) 准备下载: {video['title']}")
+
+    # 如果用户选择自动提取音频，下载与提取组成流水线：每下载完一个视频立即交给提取线程
+    extraction = None
+    if auto_extract_audio:
+        # 确定音频格式选择
+        format_choice = AUDIO_FORMAT_CHOICES.get(audio_format, "1")  # 1为AAC，2为FLAC，3为自动
+        keep_original_choice = "1" if keep_original else "2"  # 1保留，2删除
+
+        def on_audio_result(result):
+            video_name = os.path.basename(result['video_path'])
+            if result['skipped']:
+                report(f"⏭️ 音频已是最新，跳过: {video_name}")
+            elif result['success']:
+                report(f"✅ 音频提取成功: {video_name} ({audio_format}格式)")
+            else:
+                report(f"❌ 音频提取失败: {video_name}")
+
+        extraction = ExtractionStage(format_choice, keep_original_choice, on_result=on_audio_result)
+
+        # 上次已下载的视频：音频提取可能在进程退出时被中断，重新提交（已提取且未变化的会被跳过）
+        for filepaths in downloaded_items.values():
+            for video_file_path in filepaths:
+                if os.path.exists(video_file_path):
+                    extraction.submit(video_file_path)
+                elif not keep_original:
+                    # 不保留原视频时，原视频只在音频提取成功后才会被删除
+                    audio_success_count += 1
+
+    # 使用video_dlp模块的下载功能，每个视频结束时推送结果
+    succeeded_indices = set(downloaded_items)
+    completed = {'count': len(downloaded_items)}
+    # 下载进度事件按频率合并后整体替换任务的实时进度，不写入消息记录
+    progress = ProgressThrottle(lambda events: job.set_progress(ProgressThrottle.format(events)))
+
+    def on_download_result(result):
+        completed['count'] += 1
+        progress.finish(str(result['index']))
+        job_store.update_item(
+            job_id, result['index'], ITEM_DOWNLOADED if result['success'] else ITEM_FAILED,
+            result['filepaths'], result['error']
+        )
+        if result['skipped']:
+            succeeded_indices.add(result['index'])
+            report(f"⏭️ ({completed['count']}/{total_videos}) 已下载过，跳过: {result['title']}")
+            return
+        if result['success']:
+            succeeded_indices.add(result['index'])
+            report(f"✅ ({completed['count']}/{total_videos}) 下载完成: {result['title']}")
+        else:
+            report(f"❌ ({completed['count']}/{total_videos}) 下载失败: {result['title']} - {result['error']}")
+            return
+
+        if extraction:
+            # 直接使用下载器报告的最终文件路径，无需扫描下载目录
+            for video_file_path in result['filepaths']:
+                report(f"🎵 开始提取音频: {os.path.basename(video_file_path)}")
+                # 提取队列已满时在此等待，限制积压
+                extraction.submit(video_file_path)
+
+    # 恢复的任务中所有视频都已下载时只需完成音频提取（空的索引列表会被当作单个视频下载）
+    if selected_indices:
+        try:
+            report("📥 调用video_dlp进行下载...")
+
+            # 直接使用video_dlp.py的download_videos函数（并行调度，单个失败不影响其余视频）
+            # 注意：Web界面使用use_timestamp=False，直接下载到配置路径
+            download_videos(url, videos, selected_indices, cookies_path, use_timestamp=False,
+                            on_result=on_download_result, base_path=download_folder, on_progress=progress.push,
+                            skip_downloaded=not redownload)
+
+            download_success_count = len(succeeded_indices)
+            report(f"✅ 下载阶段完成: {download_success_count}/{total_videos} 个视频下载成功")
+
+        except Exception as download_error:
+            report(f"❌ 下载失败: {str(download_error)}")
+            download_success_count = len(succeeded_indices)
+
+    if extraction:
+        # 等待流水线中剩余的音频提取完成
+        audio_results = extraction.close()
+        audio_success_count += sum(1 for result in audio_results if result['success'])
+        report(f"🎵 音频提取阶段完成: {audio_success_count}/{total_videos} 个音频提取成功")
+
+    # 最终总结
+    final_message = f"🎉 所有任务完成!\n"
+    final_message += f"📊 视频下载: {download_success_count}/{total_videos}\n"
+    if auto_extract_audio and download_success_count > 0:
+        final_message += f"🎵 音频提取: {audio_success_count}/{total_videos} ({audio_format}格式)"
+
+    return final_message
+
+
+def download_selected_videos(url, video_data_json, selected_videos, auto_extract_audio, audio_format, keep_original,
+                             redownload=False):
+    """提交下载任务到后台，并流式返回任务进度"""
     if not url.strip():
-        return "❌ 请先输入URL并分析"
+        yield "❌ 请先输入URL并分析"
+        return
     
     if not video_data_json:
-        return "❌ 没有视频数据，请先分析URL"
+        yield "❌ 没有视频数据，请先分析URL"
+        return
     
     try:
         # 解析视频数据
         videos = json.loads(video_data_json)
         
         if not selected_videos:
-            return "❌ 请选择要下载的视频"
+            yield "❌ 请选择要下载的视频"
+            return
         
         # 将选择的视频标题转换为索引
         selected_indices = []
@@ -341,131 +456,85 @@ def download_selected_videos(url, video_data_json, selected_videos, auto_extract
                 continue
         
         if not selected_indices:
-            return "❌ 没有有效的视频选择"
+            yield "❌ 没有有效的视频选择"
+            return
         
         print(f"🚀 开始下载 {len(selected_indices)} 个视频...")
         
-        # 获取cookies路径和下载路径
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        cookies_path = os.path.join(script_dir, "cookies.txt")
-        download_path = get_download_path()
-        
-        # 创建进度队列和结果队列
-        progress_queue = queue.Queue()
-        result_queue = queue.Queue()
-        
-        def enhanced_download_thread():
-            try:
-                total_videos = len(selected_indices)
-                download_success_count = 0
-                audio_success_count = 0  # 在开始就初始化
-                
-                progress_queue.put(f"🚀 开始批量下载任务，共 {total_videos} 个视频")
-                
-                # 显示要下载的视频列表
-                for i, idx in enumerate(selected_indices, 1):
-                    if 0 <= idx < len(videos):
-                        video = videos[idx]
-                        progress_queue.put(f"📋 ({i}/{total_videos}) 准备下载: {video['title']}")
-                
-                # 使用video_dlp模块的下载功能，但需要包装进度反馈
-                try:
-                    progress_queue.put("📥 调用video_dlp进行下载...")
-                    
-                    # 直接使用video_dlp.py的download_videos函数
-                    # 注意：Web界面使用use_timestamp=False，直接下载到配置路径
-                    download_videos(url, videos, selected_indices, cookies_path, use_timestamp=False)
-                    
-                    # 假设下载成功（video_dlp会在失败时抛出异常）
-                    download_success_count = len(selected_indices)
-                    progress_queue.put(f"✅ 下载阶段完成: {download_success_count}/{total_videos} 个视频下载成功")
-                    
-                except Exception as download_error:
-                    progress_queue.put(f"❌ 下载失败: {str(download_error)}")
-                    download_success_count = 0
-                  # 如果用户选择自动提取音频
-                if auto_extract_audio and download_success_count > 0:
-                    progress_queue.put("🎵 开始音频提取阶段...")
-                    
-                    # 确定音频格式选择
-                    format_choice = "1" if audio_format == "AAC" else "2"  # 1为AAC，2为FLAC
-                    keep_original_choice = "1" if keep_original else "2"  # 1保留，2删除
-                    
-                    audio_success_count = 0
-                    
-                    for i, idx in enumerate(selected_indices, 1):
-                        if 0 <= idx < len(videos):
-                            video = videos[idx]
-                            video_title = video['title']
-                            
-                            progress_queue.put(f"🔍 ({i}/{total_videos}) 查找视频文件: {video_title}")
-                            
-                            # 智能查找视频文件
-                            video_file_path = find_video_file(download_path, video_title)
-                            
-                            if video_file_path and os.path.exists(video_file_path):
-                                progress_queue.put(f"🎵 ({i}/{total_videos}) 开始提取音频: {os.path.basename(video_file_path)}")
-                                
-                                if convert_to_audio(video_file_path, format_choice, keep_original_choice):
-                                    audio_success_count += 1
-                                    progress_queue.put(f"✅ ({i}/{total_videos}) 音频提取成功: {audio_format}格式")
-                                else:
-                                    progress_queue.put(f"❌ ({i}/{total_videos}) 音频提取失败")
-                            else:
-                                progress_queue.put(f"⚠️ ({i}/{total_videos}) 未找到视频文件，跳过音频提取")
-                            
-                            # 短暂延迟
-                            time.sleep(0.3)
-                    
-                    progress_queue.put(f"🎵 音频提取阶段完成: {audio_success_count}/{total_videos} 个音频提取成功")                # 最终总结
-                final_message = f"🎉 所有任务完成!\n"
-                final_message += f"📊 视频下载: {download_success_count}/{total_videos}\n"
-                if auto_extract_audio and download_success_count > 0:
-                    final_message += f"🎵 音频提取: {audio_success_count}/{total_videos} ({audio_format}格式)"
-                
-                result_queue.put(final_message)
-                
-            except Exception as e:
-                error_msg = f"❌ 处理失败: {str(e)}"
-                progress_queue.put(error_msg)
-                result_queue.put(error_msg)
-        
-        # 启动增强的下载线程
-        thread = threading.Thread(target=enhanced_download_thread)
-        thread.start()
-        
-        # 收集并返回所有进度信息
-        all_progress = []
-        timeout_count = 0
-        max_timeout = 10  # 最多等待10次超时（每次1秒）
+        # 获取cookies路径
+        cookies_path = get_cookies_path()
+        
+        # 先持久化任务记录，进程重启后可以继续未完成的视频
+        description = f"{len(selected_indices)} 个视频: {videos[selected_indices[0]]['title']}"
+        download_folder = get_download_path()
+        job_id = get_job_store().create_job(
+            url, videos, selected_indices,
+            {
+                'cookies_path': cookies_path,
+                'auto_extract_audio': auto_extract_audio,
+                'audio_format': audio_format,
+                'keep_original': keep_original,
+                'download_folder': download_folder,
+                'redownload': redownload,
+            },
+            description
+        )
         
-        while thread.is_alive() or not progress_queue.empty():
-            try:
-                # 尝试获取进度信息
-                message = progress_queue.get(timeout=1)
-                all_progress.append(message)
-                timeout_count = 0  # 重置超时计数
-            except queue.Empty:
-                timeout_count += 1
-                if timeout_count >= max_timeout and thread.is_alive():
-                    all_progress.append("🔄 任务正在进行中...（请稍候）")
-                    break
-        
-        # 获取最终结果
-        try:
-            final_result = result_queue.get(timeout=2)
-            all_progress.append(final_result)
-        except queue.Empty:
-            if thread.is_alive():
-                all_progress.append("🔄 任务仍在进行中，请查看终端获取详细信息")
-            else:
-                all_progress.append("✅ 任务已完成")
+        # 任务在后台线程中运行，页面关闭后也会继续执行，可在任务列表中查看
+        job_manager = get_job_manager()
+        job_manager.submit(
+            run_download_job,
+            job_id, url, videos, selected_indices, cookies_path, auto_extract_audio, audio_format, keep_original,
+            download_folder, None, redownload,
+            description=description,
+            job_id=job_id
+        )
         
-        # 返回所有进度信息
-        return "\n".join(all_progress)
+        # 每有新的进度消息就推送到界面，直到任务结束
+        yield from job_manager.stream(job_id)
             
     except Exception as e:
-        return f"❌ 处理失败: {str(e)}"
+        yield f"❌ 处理失败: {str(e)}"
+
+
+def resume_unfinished_jobs():
+    """启动时继续上次进程退出前未完成的下载任务"""
+    job_store = get_job_store()
+    job_manager = get_job_manager()
+    
+    for job in job_store.unfinished_jobs():
+        options = job['options']
+        # 已下载的视频的音频提取可能被中断，开启了自动提取音频时同样需要恢复
+        extraction_pending = options['auto_extract_audio'] and job['downloaded_items']
+        if not job['pending_indices'] and not extraction_pending:
+            job_store.finish_job(job['id'], "✅ 任务已完成")
+            continue
+        
+        print(f"♻️ 恢复未完成的任务 [{job['id']}]，剩余 {len(job['pending_indices'])} 个视频")
+        job_manager.submit(
+            run_download_job,
+            job['id'], job['url'], job['videos'], job['pending_indices'], options['cookies_path'],
+            options['auto_extract_audio'], options['audio_format'], options['keep_original'],
+            options['download_folder'], job['downloaded_items'], options.get('redownload', False),
+            description=f"(恢复) {job['description']}",
+            job_id=job['id']
+        )
+
+
+def refresh_job_list():
+    """刷新后台任务列表"""
+    return get_job_manager().format_jobs()
+
+
+def apply_bandwidth_limit(limit_text):
+    """修改全局下载限速，对正在进行的下载立即生效（修改config.json后以配置文件为准）"""
+    governor = get_bandwidth_governor()
+    try:
+        governor.configure(parse_rate(limit_text))
+    except ValueError as e:
+        return f"❌ {e}"
+    print(f"🚦 下载限速: {governor.describe()}")
+    return governor.describe()
 
 
 def create_interface():
@@ -581,9 +650,13 @@ def create_interface():
                             label="💾 保留原视频",
                             value=True
                         )
+                        redownload = gr.Checkbox(
+                            label="🔁 重新下载已下载过的视频",
+                            value=False
+                        )
                     with gr.Column():
                         audio_format = gr.Dropdown(
-                            choices=["AAC", "FLAC"],
+                            choices=list(AUDIO_FORMAT_CHOICES),
                             value="AAC",
                             label="🎵 音频格式",
                             elem_classes=["gradio-dropdown"]
@@ -604,6 +677,21 @@ def create_interface():
                     elem_classes=["gradio-textbox"],
                     placeholder="等待下载任务..."
                 )
+                
+                # 后台任务列表
+                job_list_display = gr.Textbox(
+                    label="🗂️ 后台任务",
+                    lines=3,
+                    max_lines=8,
+                    interactive=False,
+                    elem_classes=["gradio-textbox"],
+                    value="暂无任务"
+                )
+                refresh_jobs_btn = gr.Button(
+                    "🔄 刷新任务列表",
+                    size="sm",
+                    elem_classes=["gradio-button"]
+                )
             
             # 右侧信息显示区域
             with gr.Column(scale=1):
@@ -618,11 +706,29 @@ def create_interface():
                 # Cookies状态
                 cookies_status_display = gr.Textbox(
                     label="🍪 Cookies状态",
-                    value=check_cookies_status(),
+                    value="🔄 正在检查...",
                     interactive=False,
                     elem_classes=["gradio-textbox"]
                 )
                 
+                # 下载限速
+                bandwidth_input = gr.Textbox(
+                    label="🚦 下载限速（如 10M、500K，留空不限速）",
+                    value=format_rate(get_bandwidth_governor().limit) if get_bandwidth_governor().limit else "",
+                    elem_classes=["gradio-textbox"]
+                )
+                bandwidth_status = gr.Textbox(
+                    label="当前限速",
+                    value=get_bandwidth_governor().describe(),
+                    interactive=False,
+                    elem_classes=["gradio-textbox"]
+                )
+                bandwidth_btn = gr.Button(
+                    "应用限速",
+                    size="sm",
+                    elem_classes=["gradio-button"]
+                )
+                
                 # 视频信息
                 video_info_display = gr.Textbox(
                     label="📺 视频信息",
@@ -660,6 +766,13 @@ def create_interface():
         """)
         
         # 事件绑定
+        # 解析cookies需要导入yt-dlp，在页面加载时才检查，不拖慢启动
+        demo.load(
+            fn=check_cookies_status,
+            inputs=[],
+            outputs=[cookies_status_display]
+        )
+        
         analyze_btn.click(
             fn=analyze_and_auto_select,
             inputs=[url_input],
@@ -681,11 +794,24 @@ def create_interface():
                 video_selection,
                 auto_extract,
                 audio_format,
-                keep_original
+                keep_original,
+                redownload
             ],
             outputs=[download_status]
         )
         
+        refresh_jobs_btn.click(
+            fn=refresh_job_list,
+            inputs=[],
+            outputs=[job_list_display]
+        )
+        
+        bandwidth_btn.click(
+            fn=apply_bandwidth_limit,
+            inputs=[bandwidth_input],
+            outputs=[bandwidth_status]
+        )
+        
         # 全选按钮事件 - 修复逻辑
         def select_all_handler(current_choices):
             print(f"📌 全选操作 - 当前choices: {current_choices}")
@@ -720,21 +846,27 @@ def create_interface():
 
 
 def check_environment():
-    """检查运行环境"""
+    """检查运行环境（在进程内完成，不再启动 python -m yt_dlp 子进程）"""
     print("🔧 环境检查...")
     
     # 检查Python解释器
-    python_exe = get_python_executable()
-    print(f"🐍 Python解释器: {python_exe}")
+    print(f"🐍 Python解释器: {sys.executable}")
     
-    # 检查yt-dlp
+    # 检查yt-dlp（导入下载引擎，同时完成下载模块的预加载）
     try:
-        result = subprocess.run([python_exe, "-m", "yt_dlp", "--version"], capture_output=True, text=True, check=True)
-        print(f"✅ yt-dlp版本: {result.stdout.strip()}")
+        from download_engine import get_engine
+        print(f"✅ yt-dlp版本: {get_engine().version()}")
     except Exception as e:
         print(f"❌ yt-dlp不可用: {e}")
         return False
     
+    # 检查ffmpeg（合并音视频、嵌入封面和提取音频都需要）
+    ffmpeg_path = shutil.which("ffmpeg")
+    if ffmpeg_path:
+        print(f"✅ ffmpeg: {ffmpeg_path}")
+    else:
+        print("⚠️ 未找到ffmpeg，合并音视频、嵌入封面和提取音频将不可用")
+    
     # 检查配置文件
     download_path = get_download_path()
     print(f"📁 下载路径: {download_path}")
@@ -746,20 +878,71 @@ def check_environment():
     return True
 
 
+# 后台启动工作的结果，环境检查失败时主线程以非零状态退出
+background_status = {'failed': False}
+
+
+def start_background_services():
+    """
+    端口就绪后在后台完成的启动工作：环境检查、预加载下载模块、指标端点、恢复未完成的任务
+    环境检查失败时中断主线程，停止Web服务
+    """
+    with startup_timer.stage("环境检查"):
+        environment_ok = check_environment()
+    if not environment_ok:
+        print("❌ 环境检查失败，请检查依赖")
+        background_status['failed'] = True
+        _thread.interrupt_main()
+        return
+    
+    with startup_timer.stage("预加载下载模块"):
+        import video_dlp  # noqa: F401
+        import video_title_fetcher  # noqa: F401
+    
+    # 指标端点（Prometheus 文本格式），与Web界面使用不同端口，只监听本机
+    metrics_port = load_config().get('metrics_port', DEFAULT_METRICS_PORT)
+    if metrics_port:
+        try:
+            start_metrics_server(int(metrics_port))
+            print(f"📈 运行指标: http://127.0.0.1:{metrics_port}/metrics")
+        except OSError as e:
+            print(f"⚠️ 指标服务启动失败: {e}")
+    
+    # 继续上次未完成的下载任务
+    with startup_timer.stage("恢复未完成的任务"):
+        resume_unfinished_jobs()
+    
+    print(startup_timer.report())
+
+
 if __name__ == "__main__":
     print("🚀 启动视频下载Web界面...")
     
-    # 环境检查
-    if not check_environment():
-        print("❌ 环境检查失败，请检查依赖")
+    # 启动界面；yt-dlp 等下载模块不在这里导入，端口就绪后再在后台加载
+    with startup_timer.stage("构建界面"):
+        demo = create_interface()
+    # 允许多个用户同时提交任务、同时接收进度推送
+    demo.queue(default_concurrency_limit=16)
+    try:
+        with startup_timer.stage("启动Web服务"):
+            demo.launch(
+                server_name="0.0.0.0",
+                server_port=7862,
+                share=False,
+                inbrowser=True,
+                show_error=True,
+                prevent_thread_lock=True
+            )
+        startup_timer.mark("端口就绪（总计）")
+        print(f"⚡ Web界面已就绪，用时 {startup_timer.elapsed():.2f} 秒")
+        threading.Thread(target=start_background_services, name="startup", daemon=True).start()
+        demo.block_thread()
+    finally:
+        # 标题获取服务与Web服务器同生命周期，各次分析共用其连接池；
+        # 只在已加载时关闭，避免退出时才导入 yt-dlp（未安装时还会掩盖退出码）
+        title_fetcher = sys.modules.get('video_title_fetcher')
+        if title_fetcher is not None:
+            title_fetcher.close_title_service()
+    
+    if background_status['failed']:
         sys.exit(1)
-    
-    # 启动界面
-    demo = create_interface()
-    demo.launch(
-        server_name="0.0.0.0",
-        server_port=7862,
-        share=False,
-        inbrowser=True,
-        show_error=True
-    )